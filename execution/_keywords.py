@@ -0,0 +1,79 @@
+"""
+Shared multi-keyword matcher for the Telegram OSINT tools.
+
+Finds every keyword in a text in a single linear pass using an Aho-Corasick
+automaton (pyahocorasick). Without pyahocorasick installed it falls back to a
+precompiled regex union for search() and substring tests for matches(), which
+give the same results, just slower.
+
+Matching is on lowercase text: keywords are lowercased on construction and
+callers pass text that is already lowercased (lower once, reuse everywhere).
+"""
+
+import re
+from collections.abc import Mapping
+
+try:
+    import ahocorasick
+except ImportError:  # optional: falls back to substring scans
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """
+    Match groups of keywords against lowercase text.
+
+    Args:
+        keywords: Either an iterable of keywords (each keyword is its own
+            label) or a mapping of label -> keywords. Mapping order is the
+            label priority used by first().
+    """
+
+    def __init__(self, keywords):
+        if isinstance(keywords, Mapping):
+            groups = {label: list(words) for label, words in keywords.items()}
+        else:
+            groups = {word: [word] for word in keywords}
+
+        self.labels = tuple(groups)
+
+        # A keyword may belong to several labels (e.g. a word shared by two languages)
+        word_labels = {}
+        for label, words in groups.items():
+            for word in words:
+                word_labels.setdefault(word.lower(), []).append(label)
+        self._word_labels = {word: tuple(labels) for word, labels in word_labels.items()}
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for word, labels in self._word_labels.items():
+                self._automaton.add_word(word, labels)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            # Longest first so the union behaves like leftmost-longest matching
+            words = sorted(self._word_labels, key=len, reverse=True)
+            self._union = re.compile("|".join(map(re.escape, words))) if words else None
+
+    def search(self, text: str) -> bool:
+        """Return True if any keyword occurs in text."""
+        if self._automaton is not None:
+            return next(self._automaton.iter(text), None) is not None
+        return self._union is not None and self._union.search(text) is not None
+
+    def matches(self, text: str) -> set:
+        """Return the set of labels with at least one keyword in text."""
+        found = set()
+        if self._automaton is not None:
+            for _, labels in self._automaton.iter(text):
+                found.update(labels)
+        else:
+            for word, labels in self._word_labels.items():
+                if word in text:
+                    found.update(labels)
+        return found
+
+    def first(self, text: str, default=None):
+        """Return the highest-priority label matched in text, or default."""
+        found = self.matches(text)
+        return next((label for label in self.labels if label in found), default)
@@ -0,0 +1,45 @@
+"""
+Shared execution logging setup.
+
+Configures the root logger once per process to write to logs/exec_YYYYMMDD.log
+through a QueueHandler, with a background QueueListener doing the file IO.
+Tools call get_exec_logger() instead of repeating the setup at import time.
+"""
+
+import os
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime
+
+LOG_DIR = "logs"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_configured = False
+
+
+def get_exec_logger() -> logging.Logger:
+    """Return the root logger, configuring the exec log on first call."""
+    global _configured
+    logger = logging.getLogger()
+    if _configured:
+        return logger
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_file = f"{LOG_DIR}/exec_{datetime.now().strftime('%Y%m%d')}.log"
+
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = QueueListener(queue.Queue(-1), handler)
+    logger.addHandler(QueueHandler(listener.queue))
+    logger.setLevel(logging.INFO)
+    listener.start()
+    atexit.register(listener.stop)
+
+    _configured = True
+    return logger
+
+
+def log_execution(tool_name, params, status, error=None):
+    get_exec_logger().info(f"Tool: {tool_name} | Params: {params} | Status: {status} | Error: {error}")
@@ -0,0 +1,137 @@
+"""
+Shared JSON output helpers for the Telegram OSINT tools.
+
+JsonStreamWriter writes a single JSON object member by member, so large
+message lists can go to disk as each channel finishes instead of being held
+in memory and serialized in one go at the end. The result is an ordinary
+JSON document (compact, one list/dict item per line) that json.load() and
+ingest_elastic.py read unchanged. Output goes to "<path>.part" and is renamed
+into place only when the writer closes without an exception, so a failed run
+never replaces an earlier complete report.
+
+Values are encoded with orjson when it is installed (stdlib json otherwise);
+datetime values are written as ISO 8601 strings either way, so callers can
+store message.date as-is.
+
+    with JsonStreamWriter(path) as out:
+        out.write("period", "2025-2026")
+        out.begin("results")          # list member; begin(key, dict) for a mapping
+        out.extend(channel_results)   # as each channel completes
+        out.end()
+        out.write("total_messages", total)
+
+Inside asyncio code, extend_async()/put_async() do the encoding and disk
+write on a worker thread so a large batch does not stall the event loop;
+batches from concurrent tasks are written one at a time, in await order.
+"""
+
+import os
+import json
+import asyncio
+from datetime import date
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to stdlib json
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, default=_default).encode("utf-8")
+
+
+class JsonStreamWriter:
+    """Incrementally write one JSON object to path."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._part_path = f"{path}.part"
+        self._f = open(self._part_path, "wb")
+        self._f.write(b"{")
+        self._members = 0
+        self._close_char = None  # b"]" or b"}" while a streamed member is open
+        self._items = 0
+        self._lock = None  # asyncio.Lock, created on first async write
+
+    def _key(self, key: str):
+        if self._close_char is not None:
+            raise RuntimeError(f"Member still open in {self.path}; call end() first")
+        self._f.write((b"," if self._members else b"") + b"\n  " + _dumps(key) + b": ")
+        self._members += 1
+
+    def _next_item(self):
+        if self._close_char is None:
+            raise RuntimeError(f"No open member in {self.path}; call begin() first")
+        self._f.write((b"," if self._items else b"") + b"\n    ")
+        self._items += 1
+
+    def write(self, key: str, value):
+        """Write a complete member."""
+        self._key(key)
+        self._f.write(_dumps(value))
+
+    def begin(self, key: str, container=list):
+        """Open a list (default) or dict member to be filled incrementally."""
+        self._key(key)
+        self._f.write(b"[" if container is list else b"{")
+        self._close_char = b"]" if container is list else b"}"
+        self._items = 0
+
+    def append(self, item):
+        """Add one item to the open list member."""
+        self._next_item()
+        self._f.write(_dumps(item))
+
+    def extend(self, items):
+        """Add every item to the open list member."""
+        for item in items:
+            self.append(item)
+
+    def put(self, key: str, value):
+        """Add one key/value pair to the open dict member."""
+        self._next_item()
+        self._f.write(_dumps(key) + b": " + _dumps(value))
+
+    async def _in_thread(self, method, *args):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await asyncio.to_thread(method, *args)
+
+    async def extend_async(self, items):
+        """extend() on a worker thread."""
+        await self._in_thread(self.extend, items)
+
+    async def put_async(self, key: str, value):
+        """put() on a worker thread."""
+        await self._in_thread(self.put, key, value)
+
+    def end(self):
+        """Close the open list/dict member."""
+        self._f.write((b"\n  " if self._items else b"") + self._close_char)
+        self._close_char = None
+
+    def close(self, commit: bool = True):
+        """Close any open member and the top-level object; move into place if commit."""
+        if self._f.closed:
+            return
+        if self._close_char is not None:
+            self.end()
+        self._f.write(b"\n}\n")
+        self._f.close()
+        if commit:
+            os.replace(self._part_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
@@ -0,0 +1,154 @@
+"""
+Shared Telethon helpers for the Telegram OSINT tools.
+
+- gather_bounded(): run one coroutine per channel concurrently on a single
+  client, at most CHANNEL_CONCURRENCY at a time.
+- call_with_flood_wait(): send a raw request, sleeping through FloodWaitError
+  (Telethon only auto-sleeps waits below client.flood_sleep_threshold).
+- EntityCache: resolved channel/user peers persisted across runs, so repeat
+  runs skip the username-resolution round trip per channel.
+- telegram_client(): started client for a session, shared by every user
+  inside one process and disconnected when the outermost user is done.
+- run(): asyncio.run() on uvloop when it is installed.
+"""
+
+import os
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+from telethon.tl.types import Channel, User, InputPeerChannel, InputPeerUser
+
+try:
+    import uvloop
+except ImportError:  # optional: falls back to the default asyncio loop
+    uvloop = None
+
+# Channels searched in parallel on one client; Telegram's per-account flood
+# limits, not RTT, become the bottleneck above this.
+CHANNEL_CONCURRENCY = 4
+
+# Retries after a FloodWaitError before giving up on a request
+FLOOD_WAIT_RETRIES = 1
+
+# session name -> [client, number of open telegram_client() contexts]
+_clients = {}
+
+
+async def gather_bounded(func, items, limit: int = CHANNEL_CONCURRENCY) -> list:
+    """
+    Await func(item) for every item with at most `limit` running at once.
+
+    Returns:
+        Results in the same order as items
+    """
+    sem = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with sem:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+async def call_with_flood_wait(client, request, retries: int = FLOOD_WAIT_RETRIES):
+    """Send a Telethon request, backing off for the server-requested time on FloodWaitError."""
+    for attempt in range(retries + 1):
+        try:
+            return await client(request)
+        except FloodWaitError as e:
+            if attempt == retries:
+                raise
+            print(f"    [!] Flood wait: sleeping {e.seconds}s")
+            await asyncio.sleep(e.seconds)
+
+
+class EntityCache:
+    """
+    Username -> input peer cache stored as "<session_name>.entities.json".
+
+    Access hashes are per account, so the cache sits next to the session file
+    it belongs to. Delete the file to force fresh resolution.
+    """
+
+    def __init__(self, session_name: str):
+        self.path = f"{session_name}.entities.json"
+        self._entries = {}
+        self._dirty = False
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    async def resolve(self, client, username: str):
+        """Return an input peer for username, calling get_entity only on a cache miss."""
+        entry = self._entries.get(username)
+        if entry:
+            if entry["type"] == "channel":
+                return InputPeerChannel(entry["id"], entry["access_hash"])
+            return InputPeerUser(entry["id"], entry["access_hash"])
+
+        entity = await client.get_entity(username)
+        if isinstance(entity, (Channel, User)) and entity.access_hash is not None:
+            self._entries[username] = {
+                "type": "channel" if isinstance(entity, Channel) else "user",
+                "id": entity.id,
+                "access_hash": entity.access_hash,
+                "title": getattr(entity, "title", None),
+            }
+            self._dirty = True
+        return entity
+
+    def title(self, username: str, default=None):
+        """Return the cached channel title for username, if known."""
+        entry = self._entries.get(username)
+        return (entry or {}).get("title") or default
+
+    def save(self):
+        """Write the cache back to disk if anything new was resolved."""
+        if not self._dirty:
+            return
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        self._dirty = False
+
+
+@asynccontextmanager
+async def telegram_client(session_name: str, api_id, api_hash: str, phone: str = None):
+    """
+    Yield a started TelegramClient for session_name.
+
+    Nested users in one process (e.g. a driver that runs several searches)
+    share the client and its MTProto connection; it is disconnected when the
+    outermost context exits.
+
+    Args:
+        api_id: Telegram API ID (str from the environment is accepted)
+        phone: Login phone, only needed if the session is not authorized yet
+    """
+    entry = _clients.get(session_name)
+    if entry is None:
+        client = TelegramClient(session_name, int(api_id), api_hash,
+                                connection_retries=5, retry_delay=1, auto_reconnect=True)
+        entry = _clients[session_name] = [client, 0]
+    client = entry[0]
+    if not client.is_connected():
+        await client.start(phone=phone)
+    entry[1] += 1
+    try:
+        yield client
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _clients[session_name]
+            await client.disconnect()
+
+
+def run(coro):
+    """Run a coroutine to completion like asyncio.run(), on uvloop if installed (uvloop>=0.18)."""
+    if uvloop is not None:
+        return uvloop.run(coro)
+    return asyncio.run(coro)
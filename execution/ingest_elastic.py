@@ -369,11 +369,19 @@ def ensure_index_exists(es, index_name):
         logging.error(f"Failed to create index {index_name}: {e}")
         return False
 
-def ingest_directory(base_dir, es, index_prefix):
+# Documents per _bulk request; actions are generated lazily, so memory is
+# bounded by one chunk rather than by the whole reports tree
+BULK_CHUNK_SIZE = 500
+
+def iter_index_actions(base_dir, es, index_prefix):
+    """
+    Walk base_dir and yield one bulk "create" action per normalized document.
+
+    Each index is created (if needed) just before its first action is yielded.
+    """
     logging.info(f"Scanning {base_dir} for raw data...")
     
-    docs_to_index = []
-    indices_to_create = set()
+    indices_created = set()
     
     for root, dirs, files in os.walk(base_dir):
         # Process both raw_data and osint_construction directories
@@ -389,7 +397,9 @@ def ingest_directory(base_dir, es, index_prefix):
                 report_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
             
             index_name = f"{index_prefix}{report_ts}".lower()
-            indices_to_create.add(index_name)
+            if index_name not in indices_created:
+                ensure_index_exists(es, index_name)
+                indices_created.add(index_name)
 
             for file in files:
                 if file.endswith(".json"):
@@ -401,46 +411,51 @@ def ingest_directory(base_dir, es, index_prefix):
                             raw_content = json.load(f)
                             
                         normalized = normalize_document(raw_content, filepath, report_ts, report_id)
-                        
-                        for doc in normalized:
-                            action = {
-                                "_index": index_name,
-                                "_id": doc.pop("_id"), # Use generated ID
-                                "_op_type": "create",  # Skip duplicates instead of updating
-                                "_source": doc
-                            }
-                            docs_to_index.append(action)
-                            
                     except Exception as e:
                         logging.error(f"Failed to process {filepath}: {e}")
+                        continue
+                    
+                    for doc in normalized:
+                        yield {
+                            "_index": index_name,
+                            "_id": doc.pop("_id"), # Use generated ID
+                            "_op_type": "create",  # Skip duplicates instead of updating
+                            "_source": doc
+                        }
 
-    # Create all required indices before ingestion
-    for index_name in indices_to_create:
-        ensure_index_exists(es, index_name)
-
-    if docs_to_index:
-        logging.info(f"Ingesting {len(docs_to_index)} documents into {len(indices_to_create)} index(es)...")
-        try:
-            success, errors = helpers.bulk(es, docs_to_index, stats_only=False, raise_on_error=False)
-            
-            if errors:
-                logging.error(f"Bulk ingestion completed with errors. Success: {success}, Failed: {len(errors)}")
-                # Log first few errors for debugging
-                for i, error in enumerate(errors[:5]):
-                    if 'index' in error:
-                        doc_id = error['index'].get('_id', 'unknown')
-                        error_msg = error['index'].get('error', {})
-                        error_type = error_msg.get('type', 'unknown')
-                        error_reason = error_msg.get('reason', 'unknown')
-                        logging.error(f"  Failed doc {i+1} (ID: {doc_id}): {error_type} - {error_reason}")
-                if len(errors) > 5:
-                    logging.error(f"  ... and {len(errors) - 5} more errors")
+def ingest_directory(base_dir, es, index_prefix):
+    actions = iter_index_actions(base_dir, es, index_prefix)
+    success = 0
+    errors = []
+    
+    try:
+        for ok, item in helpers.streaming_bulk(es, actions, chunk_size=BULK_CHUNK_SIZE,
+                                               raise_on_error=False):
+            if ok:
+                success += 1
             else:
-                logging.info(f"Ingestion complete. Success: {success}, Failed: 0")
-        except Exception as e:
-            logging.error(f"Bulk ingestion failed: {e}")
-    else:
+                errors.append(item)
+    except Exception as e:
+        logging.error(f"Bulk ingestion failed after {success} documents: {e}")
+        return
+    
+    if not success and not errors:
         logging.info("No documents found to ingest.")
+    elif errors:
+        logging.error(f"Bulk ingestion completed with errors. Success: {success}, Failed: {len(errors)}")
+        # Log first few errors for debugging
+        for i, error in enumerate(errors[:5]):
+            # Keyed by op type ("create" here)
+            result = next(iter(error.values()), {})
+            doc_id = result.get('_id', 'unknown')
+            error_msg = result.get('error', {})
+            error_type = error_msg.get('type', 'unknown')
+            error_reason = error_msg.get('reason', 'unknown')
+            logging.error(f"  Failed doc {i+1} (ID: {doc_id}): {error_type} - {error_reason}")
+        if len(errors) > 5:
+            logging.error(f"  ... and {len(errors) - 5} more errors")
+    else:
+        logging.info(f"Ingestion complete. Success: {success}, Failed: 0")
 
 def main():
     try:
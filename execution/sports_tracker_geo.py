@@ -19,27 +19,22 @@ import logging
 import requests
 import argparse
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from urllib.parse import urlencode
+from pathlib import Path
 
-# Setup logging
-log_dir = "logs"
-os.makedirs(log_dir, exist_ok=True)
-date_str = datetime.now().strftime("%Y%m%d")
-log_file = f"{log_dir}/exec_{date_str}.log"
+try:
+    import orjson
+except ImportError:  # optional: falls back to stdlib json
+    orjson = None
 
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+from _logging import get_exec_logger, log_execution
+
+get_exec_logger()
 
 API_BASE = "https://api.sports-tracker.com/apiserver/v1"
 WEB_BASE = "https://www.sports-tracker.com"
 
-def log_execution(tool_name, params, status, error=None):
-    logging.info(f"Tool: {tool_name} | Params: {params} | Status: {status} | Error: {error}")
-
 def load_env():
     """Load environment variables from .env file."""
     env_vars = {}
@@ -76,6 +71,7 @@ def authenticate(username: str, password: str) -> Optional[str]:
         "l": username,
         "p": password
     }
+    body = urlencode(payload).encode()
 
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
@@ -85,7 +81,7 @@ def authenticate(username: str, password: str) -> Optional[str]:
     }
 
     try:
-        response = requests.post(url, data=payload, headers=headers)
+        response = requests.post(url, data=body, headers=headers)
         response.raise_for_status()
         data = response.json()
 
@@ -158,7 +154,7 @@ def get_workout_gpx(token: str, workout_key: str) -> Optional[str]:
         logging.error(f"Error exporting GPX for {workout_key}: {e}")
         return None
 
-def explore_routes(token: str, bounds: List[float], activity_type: int = 0) -> Optional[dict]:
+def explore_routes(token: str, bounds: Tuple[float, float, float, float], activity_type: int = 0) -> Optional[dict]:
     """
     Explore public routes/heatmap data in geographic bounds.
 
@@ -177,11 +173,12 @@ def explore_routes(token: str, bounds: List[float], activity_type: int = 0) -> O
         f"{API_BASE}/explore/routes"
     ]
 
+    south, west, north, east = bounds
     params = {
-        "swLat": bounds[0],
-        "swLng": bounds[1],
-        "neLat": bounds[2],
-        "neLng": bounds[3],
+        "swLat": south,
+        "swLng": west,
+        "neLat": north,
+        "neLng": east,
         "activityType": activity_type
     }
 
@@ -285,13 +282,14 @@ def get_user_profile(user_key: str, token: str = None) -> Optional[dict]:
         logging.error(f"Error fetching user profile {user_key}: {e}")
         return None
 
-def filter_workouts_by_location(workouts: List[dict], bounds: List[float]) -> List[dict]:
+def filter_workouts_by_location(workouts: List[dict],
+                                bounds: Tuple[float, float, float, float]) -> List[dict]:
     """
     Filter workouts by geographic bounds.
 
     Args:
         workouts: List of workout objects
-        bounds: [south_lat, west_lng, north_lat, east_lng]
+        bounds: (south_lat, west_lng, north_lat, east_lng)
     """
     filtered = []
     south, west, north, east = bounds
@@ -327,6 +325,25 @@ def filter_workouts_by_date(workouts: List[dict], start_date: str, end_date: str
 
     return filtered
 
+def _parse_bounds(s: str) -> Tuple[float, float, float, float]:
+    """Parse 'south_lat,west_lng,north_lat,east_lng' into a tuple of floats."""
+    south, west, north, east = map(float, s.split(","))
+    return (south, west, north, east)
+
+def save_json(output_file: str, data, pretty: bool = False):
+    """
+    Write data as UTF-8 JSON, compact unless pretty is set.
+
+    Uses orjson when available; output is machine-consumed in most pipelines,
+    so indentation is opt-in.
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        Path(output_file).write_bytes(orjson.dumps(data, option=option))
+    else:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2 if pretty else None, ensure_ascii=False)
+
 def main():
     parser = argparse.ArgumentParser(description="Sports Tracker Geo Intelligence Tool")
     parser.add_argument("--action", required=True,
@@ -344,9 +361,18 @@ def main():
     parser.add_argument("--end-date", help="End date filter (YYYY-MM-DD)")
     parser.add_argument("--limit", type=int, default=100, help="Number of results")
     parser.add_argument("--output-dir", default=".tmp", help="Output directory")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output for human reading")
 
     args = parser.parse_args()
 
+    bounds = None
+    if args.bounds:
+        try:
+            bounds = _parse_bounds(args.bounds)
+        except ValueError:
+            print("Error: --bounds must be four comma-separated numbers: south_lat,west_lng,north_lat,east_lng")
+            sys.exit(1)
+
     # Load credentials from env if not provided
     env = load_env()
     token = args.token or env.get("SPORTS_TRACKER_TOKEN")
@@ -385,8 +411,7 @@ def main():
             workouts = result["payload"]
 
             # Apply filters if specified
-            if args.bounds:
-                bounds = [float(x) for x in args.bounds.split(",")]
+            if bounds:
                 workouts = filter_workouts_by_location(workouts, bounds)
                 params_log["bounds"] = args.bounds
 
@@ -438,11 +463,10 @@ def main():
         sys.exit(0)
 
     elif args.action == "explore":
-        if not args.bounds:
+        if not bounds:
             print("Error: --bounds required for explore action")
             sys.exit(1)
 
-        bounds = [float(x) for x in args.bounds.split(",")]
         params_log["bounds"] = args.bounds
 
         result = explore_routes(token, bounds)
@@ -479,8 +503,7 @@ def main():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_file = f"{args.output_dir}/sports_tracker_{args.action}_{timestamp}.json"
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        save_json(output_file, result, pretty=args.pretty)
 
         print(f"Results saved to {output_file}")
         log_execution("sports_tracker_geo.py", params_log, "SUCCESS")
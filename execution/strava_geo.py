@@ -14,25 +14,25 @@ import json
 import logging
 import requests
 import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
+from urllib.parse import urlencode
 
-# Setup logging
-log_dir = "logs"
-os.makedirs(log_dir, exist_ok=True)
-date_str = datetime.now().strftime("%Y%m%d")
-log_file = f"{log_dir}/exec_{date_str}.log"
+from _logging import get_exec_logger, log_execution
 
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+get_exec_logger()
 
 STRAVA_API_BASE = "https://www.strava.com/api/v3"
 
-def log_execution(tool_name, params, status, error=None):
-    logging.info(f"Tool: {tool_name} | Params: {params} | Status: {status} | Error: {error}")
+# Paged pulls: pages fetched in parallel per batch, backoff on HTTP 429
+PAGE_CONCURRENCY = 4
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF = 15  # seconds, multiplied by attempt number
+
+# Refresh the access token this many seconds before STRAVA_TOKEN_EXPIRES_AT
+TOKEN_REFRESH_MARGIN = 60
 
 def load_env():
     """Load environment variables from .env file."""
@@ -56,9 +56,11 @@ def refresh_access_token(client_id: str, client_secret: str, refresh_token: str)
         "refresh_token": refresh_token,
         "grant_type": "refresh_token"
     }
+    body = urlencode(payload).encode()
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
     try:
-        response = requests.post(url, data=payload)
+        response = requests.post(url, data=body, headers=headers)
         response.raise_for_status()
         data = response.json()
         new_access_token = data.get("access_token")
@@ -66,15 +68,15 @@ def refresh_access_token(client_id: str, client_secret: str, refresh_token: str)
 
         # Update .env file with new tokens
         if new_access_token and new_refresh_token:
-            update_env_tokens(new_access_token, new_refresh_token)
+            update_env_tokens(new_access_token, new_refresh_token, data.get("expires_at"))
             logging.info("Refreshed Strava access token successfully")
             return new_access_token
     except Exception as e:
         logging.error(f"Failed to refresh token: {e}")
         return None
 
-def update_env_tokens(access_token: str, refresh_token: str):
-    """Update .env file with new tokens."""
+def update_env_tokens(access_token: str, refresh_token: str, expires_at: int = None):
+    """Update .env file with new tokens and, if given, their expiry (epoch seconds)."""
     if not os.path.exists(".env"):
         return
 
@@ -82,22 +84,66 @@ def update_env_tokens(access_token: str, refresh_token: str):
         lines = f.readlines()
 
     new_lines = []
+    wrote_expiry = False
     for line in lines:
         if line.startswith("STRAVA_ACCESS_TOKEN="):
             new_lines.append(f"STRAVA_ACCESS_TOKEN={access_token}\n")
         elif line.startswith("STRAVA_REFRESH_TOKEN="):
             new_lines.append(f"STRAVA_REFRESH_TOKEN={refresh_token}\n")
+        elif line.startswith("STRAVA_TOKEN_EXPIRES_AT="):
+            if expires_at is not None:
+                new_lines.append(f"STRAVA_TOKEN_EXPIRES_AT={expires_at}\n")
+                wrote_expiry = True
+            else:
+                new_lines.append(line)
         else:
             new_lines.append(line)
 
+    if expires_at is not None and not wrote_expiry:
+        if new_lines and not new_lines[-1].endswith("\n"):
+            new_lines[-1] += "\n"
+        new_lines.append(f"STRAVA_TOKEN_EXPIRES_AT={expires_at}\n")
+
     with open(".env", "w") as f:
         f.writelines(new_lines)
 
+def _ensure_fresh_token(env: dict) -> Optional[str]:
+    """
+    Return a usable access token, refreshing it first if it expires within
+    TOKEN_REFRESH_MARGIN seconds.
+
+    Without STRAVA_TOKEN_EXPIRES_AT in .env the cached token is returned as-is
+    and expiry is handled reactively on a 401. After a refresh, env is reloaded
+    from .env so callers see the rotated refresh token.
+    """
+    access_token = env.get("STRAVA_ACCESS_TOKEN")
+    expires_at = env.get("STRAVA_TOKEN_EXPIRES_AT")
+
+    try:
+        expired = expires_at is not None and time.time() >= int(expires_at) - TOKEN_REFRESH_MARGIN
+    except ValueError:
+        expired = False
+
+    if expired or (not access_token and env.get("STRAVA_REFRESH_TOKEN")):
+        logging.info("Strava access token expired or missing, refreshing proactively")
+        new_token = refresh_access_token(env.get("STRAVA_ID"), env.get("STRAVA_SECRET"),
+                                         env.get("STRAVA_REFRESH_TOKEN"))
+        if new_token:
+            env.update(load_env())
+            return new_token
+
+    return access_token
+
+def _parse_bounds(s: str) -> Tuple[float, float, float, float]:
+    """Parse 'south_lat,west_lng,north_lat,east_lng' into a tuple of floats."""
+    south, west, north, east = map(float, s.split(","))
+    return (south, west, north, east)
+
 def get_auth_header(access_token: str) -> dict:
     """Return authorization header for Strava API."""
     return {"Authorization": f"Bearer {access_token}"}
 
-def explore_segments(access_token: str, bounds: list, activity_type: str = "riding") -> Optional[dict]:
+def explore_segments(access_token: str, bounds: Tuple[float, float, float, float], activity_type: str = "riding") -> Optional[dict]:
     """
     Explore segments within geographic bounds.
 
@@ -129,6 +175,55 @@ def explore_segments(access_token: str, bounds: list, activity_type: str = "ridi
         logging.error(f"Error exploring segments: {e}")
         return None
 
+def _get_page(url: str, headers: dict, params: dict, page: int):
+    """Fetch a single page, backing off and retrying on HTTP 429."""
+    for attempt in range(1, RATE_LIMIT_RETRIES + 1):
+        response = requests.get(url, headers=headers, params={**params, "page": page})
+        if response.status_code != 429:
+            break
+        logging.warning(f"Rate limited on {url} page {page}, retry {attempt}/{RATE_LIMIT_RETRIES}")
+        time.sleep(RATE_LIMIT_BACKOFF * attempt)
+    response.raise_for_status()
+    return response.json()
+
+def fetch_all_pages(access_token: str, url: str, params: dict, per_page: int,
+                    items_key: str = None, concurrency: int = PAGE_CONCURRENCY) -> list:
+    """
+    Fetch every page of a paginated endpoint, `concurrency` pages at a time.
+
+    Stops at the first page that comes back short of per_page.
+
+    Args:
+        access_token: Strava OAuth access token
+        url: Endpoint URL
+        params: Query parameters (without 'page')
+        per_page: Page size requested from the API
+        items_key: Key holding the item list if the page is a dict (e.g. 'entries')
+        concurrency: Number of pages requested in parallel
+
+    Returns:
+        All items across pages, in page order
+    """
+    headers = get_auth_header(access_token)
+    params = {**params, "per_page": per_page}
+    results = []
+    page = 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            batch = pool.map(lambda p: _get_page(url, headers, params, p),
+                             range(page, page + concurrency))
+            done = False
+            for data in batch:
+                items = data.get(items_key, []) if items_key else data
+                results.extend(items)
+                if len(items) < per_page:
+                    done = True
+                    break
+            if done:
+                return results
+            page += concurrency
+
 def get_segment_details(access_token: str, segment_id: int) -> Optional[dict]:
     """Get detailed information about a specific segment."""
     url = f"{STRAVA_API_BASE}/segments/{segment_id}"
@@ -143,7 +238,8 @@ def get_segment_details(access_token: str, segment_id: int) -> Optional[dict]:
 
 def get_segment_leaderboard(access_token: str, segment_id: int,
                             date_range: str = None,
-                            per_page: int = 200) -> Optional[dict]:
+                            per_page: int = 200,
+                            all_pages: bool = False) -> Optional[dict]:
     """
     Get leaderboard for a segment (athletes who completed it).
 
@@ -152,6 +248,7 @@ def get_segment_leaderboard(access_token: str, segment_id: int,
         segment_id: The segment ID
         date_range: Filter by date range ('this_year', 'this_month', 'this_week', 'today')
         per_page: Number of results (max 200)
+        all_pages: Fetch every page instead of only the first
 
     Returns:
         Leaderboard data with athlete efforts
@@ -163,6 +260,10 @@ def get_segment_leaderboard(access_token: str, segment_id: int,
         params["date_range"] = date_range
 
     try:
+        if all_pages:
+            entries = fetch_all_pages(access_token, url, params, per_page, items_key="entries")
+            return {"entries": entries, "entry_count": len(entries)}
+
         response = requests.get(url, headers=get_auth_header(access_token), params=params)
         response.raise_for_status()
         return response.json()
@@ -172,7 +273,8 @@ def get_segment_leaderboard(access_token: str, segment_id: int,
 
 def get_segment_efforts(access_token: str, segment_id: int,
                         start_date: str = None, end_date: str = None,
-                        per_page: int = 200) -> Optional[dict]:
+                        per_page: int = 200,
+                        all_pages: bool = False) -> Optional[dict]:
     """
     Get all efforts on a segment within a date range.
 
@@ -182,6 +284,7 @@ def get_segment_efforts(access_token: str, segment_id: int,
         start_date: ISO 8601 date string (e.g., '2026-01-01T00:00:00Z')
         end_date: ISO 8601 date string
         per_page: Number of results per page
+        all_pages: Fetch every page instead of only the first
     """
     url = f"{STRAVA_API_BASE}/segment_efforts"
     params = {
@@ -195,6 +298,9 @@ def get_segment_efforts(access_token: str, segment_id: int,
         params["end_date_local"] = end_date
 
     try:
+        if all_pages:
+            return fetch_all_pages(access_token, url, params, per_page)
+
         response = requests.get(url, headers=get_auth_header(access_token), params=params)
         response.raise_for_status()
         return response.json()
@@ -216,13 +322,23 @@ def main():
                         help="Date range filter for leaderboard")
     parser.add_argument("--start-date", help="Start date (ISO 8601) for efforts query")
     parser.add_argument("--end-date", help="End date (ISO 8601) for efforts query")
+    parser.add_argument("--all-pages", action="store_true",
+                        help="Fetch every page for leaderboard/efforts (parallel, rate-limit aware)")
     parser.add_argument("--output-dir", default=".tmp", help="Output directory")
 
     args = parser.parse_args()
 
+    bounds = None
+    if args.bounds:
+        try:
+            bounds = _parse_bounds(args.bounds)
+        except ValueError:
+            print("Error: --bounds must be four comma-separated numbers: south_lat,west_lng,north_lat,east_lng")
+            sys.exit(1)
+
     # Load credentials
     env = load_env()
-    access_token = env.get("STRAVA_ACCESS_TOKEN")
+    access_token = _ensure_fresh_token(env)
     client_id = env.get("STRAVA_ID")
     client_secret = env.get("STRAVA_SECRET")
     refresh_token = env.get("STRAVA_REFRESH_TOKEN")
@@ -236,16 +352,15 @@ def main():
     params_log = {"action": args.action}
 
     if args.action == "explore":
-        if not args.bounds:
+        if not bounds:
             print("Error: --bounds required for explore action")
             sys.exit(1)
-        bounds = [float(x) for x in args.bounds.split(",")]
         params_log["bounds"] = args.bounds
         params_log["activity_type"] = args.activity_type
 
         result = explore_segments(access_token, bounds, args.activity_type)
 
-        # Handle token expiration
+        # Handle token expiration (fallback when STRAVA_TOKEN_EXPIRES_AT is unknown)
         if result and result.get("error") == "token_expired":
             print("Access token expired, attempting refresh...")
             new_token = refresh_access_token(client_id, client_secret, refresh_token)
@@ -268,7 +383,9 @@ def main():
             sys.exit(1)
         params_log["segment_id"] = args.segment_id
         params_log["date_range"] = args.date_range
-        result = get_segment_leaderboard(access_token, args.segment_id, args.date_range)
+        params_log["all_pages"] = args.all_pages
+        result = get_segment_leaderboard(access_token, args.segment_id, args.date_range,
+                                         all_pages=args.all_pages)
 
     elif args.action == "efforts":
         if not args.segment_id:
@@ -277,7 +394,9 @@ def main():
         params_log["segment_id"] = args.segment_id
         params_log["start_date"] = args.start_date
         params_log["end_date"] = args.end_date
-        result = get_segment_efforts(access_token, args.segment_id, args.start_date, args.end_date)
+        params_log["all_pages"] = args.all_pages
+        result = get_segment_efforts(access_token, args.segment_id, args.start_date, args.end_date,
+                                     all_pages=args.all_pages)
 
     if result:
         # Save output
@@ -5,7 +5,7 @@ Searches German Telegram channels for construction-related discussions
 """
 
 import os
-import json
+import re
 import asyncio
 from datetime import datetime, timedelta
 from telethon import TelegramClient
@@ -13,12 +13,16 @@ from telethon.tl.functions.messages import SearchGlobalRequest
 from telethon.tl.types import InputMessagesFilterEmpty
 from dotenv import load_dotenv
 
+from _output import JsonStreamWriter
+from _telegram import gather_bounded, call_with_flood_wait, EntityCache
+
 load_dotenv()
 
 # Telegram API credentials
 API_ID = int(os.getenv('TELEGRAM_API_ID'))
 API_HASH = os.getenv('TELEGRAM_API_HASH')
 PHONE = os.getenv('TELEGRAM_PHONE')
+SESSION_NAME = 'osint_session'
 
 # Output directory
 OUTPUT_DIR = "reports/20260213_142123_berlin_grid_attack_eg_volt/osint_construction"
@@ -49,6 +53,11 @@ SEARCH_QUERIES = [
     "Lichterfelde Dezember 2025 Bauarbeiten",
 ]
 
+# Channel keyword filter: one case-insensitive union, stops at the first hit
+CHANNEL_KEYWORDS = ["Lichterfelde", "Teltowkanal", "Ostpreußendamm", "Goerzallee",
+                    "Stromnetz", "Bauarbeiten", "Baustelle", "Kabelarbeiten"]
+CHANNEL_KEYWORD_RE = re.compile("|".join(map(re.escape, CHANNEL_KEYWORDS)), re.IGNORECASE)
+
 # Target channels (German local/construction channels)
 TARGET_CHANNELS = [
     "@berlinverkehr",
@@ -63,7 +72,7 @@ async def search_telegram(client, query, start_date, end_date):
     
     try:
         # Global search
-        search_result = await client(SearchGlobalRequest(
+        search_result = await call_with_flood_wait(client, SearchGlobalRequest(
             q=query,
             filter=InputMessagesFilterEmpty(),
             min_date=start_date,
@@ -77,7 +86,7 @@ async def search_telegram(client, query, start_date, end_date):
         for message in search_result.messages:
             if hasattr(message, 'message') and message.message:
                 results.append({
-                    "date": message.date.isoformat(),
+                    "date": message.date,
                     "message": message.message,
                     "chat_id": message.peer_id.channel_id if hasattr(message.peer_id, 'channel_id') else None,
                     "message_id": message.id
@@ -88,12 +97,12 @@ async def search_telegram(client, query, start_date, end_date):
     
     return results
 
-async def search_channel(client, channel_username, keywords, start_date, end_date):
-    """Search specific channel for keywords"""
+async def search_channel(client, entities, channel_username, keyword_re, start_date, end_date):
+    """Search specific channel for messages matching keyword_re"""
     results = []
     
     try:
-        entity = await client.get_entity(channel_username)
+        entity = await entities.resolve(client, channel_username)
         
         async for message in client.iter_messages(entity, offset_date=end_date, reverse=True):
             if message.date < start_date:
@@ -101,14 +110,13 @@ async def search_channel(client, channel_username, keywords, start_date, end_dat
             
             if message.message:
                 # Check if any keyword is in message
-                message_lower = message.message.lower()
-                if any(keyword.lower() in message_lower for keyword in keywords):
+                if keyword_re.search(message.message):
                     results.append({
                         "channel": channel_username,
-                        "date": message.date.isoformat(),
+                        "date": message.date,
                         "message": message.message,
                         "message_id": message.id,
-                        "views": message.views if hasattr(message, 'views') else None
+                        "views": getattr(message, 'views', None)
                     })
     
     except Exception as e:
@@ -127,64 +135,71 @@ async def main():
     end_date = datetime(2026, 1, 3, 23, 59, 59)
     
     # Initialize Telegram client
-    client = TelegramClient('osint_session', API_ID, API_HASH)
+    client = TelegramClient(SESSION_NAME, API_ID, API_HASH)
+    entities = EntityCache(SESSION_NAME)
     
     try:
         await client.start(phone=PHONE)
         print("✓ Connected to Telegram\n")
         
-        all_results = {
-            "timestamp": datetime.now().isoformat(),
-            "search_period": {
+        # Results are streamed to disk as each search finishes
+        output_file = os.path.join(OUTPUT_DIR, "09_telegram_osint.json")
+        total_messages = 0
+
+        with JsonStreamWriter(output_file) as out:
+            out.write("timestamp", datetime.now().isoformat())
+            out.write("search_period", {
                 "start": start_date.isoformat(),
                 "end": end_date.isoformat()
-            },
-            "global_searches": {},
-            "channel_searches": {}
-        }
-        
-        # 1. Global searches
-        print("[1/2] Performing global searches...")
-        for i, query in enumerate(SEARCH_QUERIES, 1):
-            print(f"  [{i}/{len(SEARCH_QUERIES)}] Searching: {query}")
-            results = await search_telegram(client, query, start_date, end_date)
-            all_results["global_searches"][query] = {
-                "count": len(results),
-                "messages": results
-            }
-            print(f"      Found: {len(results)} messages")
-            await asyncio.sleep(2)  # Rate limiting
-        
-        # 2. Channel-specific searches
-        print("\n[2/2] Searching specific channels...")
-        keywords = ["Lichterfelde", "Teltowkanal", "Ostpreußendamm", "Goerzallee", 
-                   "Stromnetz", "Bauarbeiten", "Baustelle", "Kabelarbeiten"]
-        
-        for i, channel in enumerate(TARGET_CHANNELS, 1):
-            print(f"  [{i}/{len(TARGET_CHANNELS)}] Searching channel: {channel}")
-            results = await search_channel(client, channel, keywords, start_date, end_date)
-            all_results["channel_searches"][channel] = {
-                "count": len(results),
-                "messages": results
-            }
-            print(f"      Found: {len(results)} messages")
-            await asyncio.sleep(2)  # Rate limiting
-        
-        # Save results
-        output_file = os.path.join(OUTPUT_DIR, "09_telegram_osint.json")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_results, f, ensure_ascii=False, indent=2)
-        
+            })
+
+            # 1. Global searches
+            print("[1/2] Performing global searches...")
+            out.begin("global_searches", dict)
+
+            async def run_global_search(query):
+                print(f"  Searching: {query}")
+                results = await search_telegram(client, query, start_date, end_date)
+                await out.put_async(query, {
+                    "count": len(results),
+                    "messages": results
+                })
+                print(f"      '{query}' found: {len(results)} messages")
+                await asyncio.sleep(2)  # Rate limiting
+                return len(results)
+
+            total_messages += sum(await gather_bounded(run_global_search, SEARCH_QUERIES))
+            out.end()
+
+            # 2. Channel-specific searches
+            print("\n[2/2] Searching specific channels...")
+            out.begin("channel_searches", dict)
+
+            async def run_channel_search(channel):
+                print(f"  Searching channel: {channel}")
+                results = await search_channel(client, entities, channel, CHANNEL_KEYWORD_RE, start_date, end_date)
+                await out.put_async(channel, {
+                    "count": len(results),
+                    "messages": results
+                })
+                print(f"      {channel} found: {len(results)} messages")
+                await asyncio.sleep(2)  # Rate limiting
+                return len(results)
+
+            total_messages += sum(await gather_bounded(run_channel_search, TARGET_CHANNELS))
+            out.end()
+
         print("\n" + "=" * 80)
         print(f"✓ Telegram OSINT Complete")
         print(f"✓ Results saved to: {output_file}")
-        print(f"✓ Total messages found: {sum(s['count'] for s in all_results['global_searches'].values()) + sum(s['count'] for s in all_results['channel_searches'].values())}")
+        print(f"✓ Total messages found: {total_messages}")
         print("=" * 80)
     
     except Exception as e:
         print(f"\n❌ Error: {e}")
     
     finally:
+        entities.save()
         await client.disconnect()
 
 if __name__ == "__main__":
@@ -6,20 +6,23 @@ Period: 2025-2026
 """
 
 import asyncio
-import json
 import os
-import re
 from datetime import datetime, timezone
 from telethon import TelegramClient
 from telethon.tl.functions.messages import SearchRequest
 from telethon.tl.types import InputMessagesFilterEmpty
 from dotenv import load_dotenv
 
+from _keywords import KeywordMatcher
+from _output import JsonStreamWriter
+from _telegram import gather_bounded, call_with_flood_wait, EntityCache
+
 load_dotenv()
 
 API_ID = os.getenv('TELEGRAM_API_ID')
 API_HASH = os.getenv('TELEGRAM_API_HASH')
 PHONE = os.getenv('TELEGRAM_PHONE')
+SESSION_NAME = 'osint_session'
 
 # Crypto payment keywords
 CRYPTO_QUERIES = [
@@ -68,21 +71,28 @@ CHANNELS = [
     "@layboard",
 ]
 
-# Crypto patterns for detection
-CRYPTO_PATTERNS = [
-    r'USDT',
-    r'BTC',
-    r'биткоин',
-    r'крипт',
-    r'\+?[\d]{10,}.*USDT',
-    r'TRC20|ERC20',
+# Crypto keywords for detection (case-insensitive). A phone-number-then-USDT
+# pattern needs no separate check: any message it matches contains "usdt".
+CRYPTO_KEYWORDS = [
+    "usdt",
+    "btc",
+    "биткоин",
+    "крипт",
+    "trc20",
+    "erc20",
 ]
 
+CRYPTO_MATCHER = KeywordMatcher(CRYPTO_KEYWORDS)
+
+# Stored message text is truncated to this many characters
+TEXT_PREVIEW_CHARS = 500
 
-async def search_channel(client, channel_name, queries):
+
+async def search_channel(client, entities, channel_name, queries):
     results = []
+    seen_by_id = {}  # message id -> (text preview, has_crypto)
     try:
-        entity = await client.get_entity(channel_name)
+        entity = await entities.resolve(client, channel_name)
         print(f"  [+] {channel_name}")
     except Exception as e:
         print(f"  [-] {channel_name}: {e}")
@@ -90,7 +100,7 @@ async def search_channel(client, channel_name, queries):
 
     for query in queries:
         try:
-            search_result = await client(SearchRequest(
+            search_result = await call_with_flood_wait(client, SearchRequest(
                 peer=entity,
                 q=query,
                 filter=InputMessagesFilterEmpty(),
@@ -108,15 +118,24 @@ async def search_channel(client, channel_name, queries):
                 if not msg.message:
                     continue
                 
-                # Check for crypto patterns in message
-                has_crypto = any(re.search(p, msg.message, re.IGNORECASE) for p in CRYPTO_PATTERNS)
+                # Preview and crypto check are built once per message and
+                # shared by every query that returns it (text[:n] of a short
+                # text is the text itself, so only long texts are copied)
+                seen = seen_by_id.get(msg.id)
+                if seen is None:
+                    text = msg.message
+                    seen = seen_by_id[msg.id] = (
+                        text[:TEXT_PREVIEW_CHARS],
+                        CRYPTO_MATCHER.search(text.lower()),
+                    )
+                preview, has_crypto = seen
                 
                 results.append({
                     "channel": channel_name,
                     "query": query,
                     "message_id": msg.id,
-                    "date": msg.date.isoformat(),
-                    "text": msg.message[:500],
+                    "date": msg.date,
+                    "text": preview,
                     "has_crypto_mention": has_crypto,
                 })
 
@@ -135,35 +154,39 @@ async def main():
     print(f"  Queries: {len(ALL_QUERIES)}")
     print("=" * 60)
 
-    client = TelegramClient('osint_session', int(API_ID), API_HASH)
+    client = TelegramClient(SESSION_NAME, int(API_ID), API_HASH)
+    entities = EntityCache(SESSION_NAME)
     await client.start(phone=PHONE)
     print("[+] Connected\n")
 
-    all_results = []
-    for channel in CHANNELS:
-        results = await search_channel(client, channel, ALL_QUERIES)
-        all_results.extend(results)
-        print(f"    Found: {len(results)} messages")
+    # Results are streamed to disk as each channel finishes
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs("reports", exist_ok=True)
+    out_file = f"reports/telegram_crypto_search_{ts}.json"
 
-    await client.disconnect()
+    with JsonStreamWriter(out_file) as out:
+        out.write("period", "2025-2026")
+        out.begin("results")
 
-    # Filter to crypto-relevant
-    crypto_results = [r for r in all_results if r.get('has_crypto_mention')]
+        async def run_channel(channel):
+            results = await search_channel(client, entities, channel, ALL_QUERIES)
+            await out.extend_async(results)
+            print(f"    {channel} found: {len(results)} messages")
+            return len(results), sum(1 for r in results if r["has_crypto_mention"])
 
-    print(f"\n[=] Total: {len(all_results)} messages")
-    print(f"[=] Crypto-relevant: {len(crypto_results)} messages")
+        counts = await gather_bounded(run_channel, CHANNELS)
+        out.end()
 
-    # Save
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    os.makedirs("reports", exist_ok=True)
-    out_file = f"reports/telegram_crypto_search_{ts}.json"
-    with open(out_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            "period": "2025-2026",
-            "total_messages": len(all_results),
-            "crypto_relevant": len(crypto_results),
-            "results": all_results,
-        }, f, ensure_ascii=False, indent=2)
+        total_messages = sum(total for total, _ in counts)
+        crypto_relevant = sum(crypto for _, crypto in counts)
+        out.write("total_messages", total_messages)
+        out.write("crypto_relevant", crypto_relevant)
+
+    entities.save()
+    await client.disconnect()
+
+    print(f"\n[=] Total: {total_messages} messages")
+    print(f"[=] Crypto-relevant: {crypto_relevant} messages")
     print(f"\n[+] Saved: {out_file}")
 
 
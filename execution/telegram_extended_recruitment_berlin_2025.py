@@ -5,23 +5,28 @@ Additional queries and broader time window for Russian recruitment data
 """
 
 import asyncio
-import json
 import os
-from datetime import datetime
+import shutil
+from collections import Counter
+from datetime import datetime, timezone
 from telethon import TelegramClient
-from telethon.tl.functions.messages import SearchRequest, GetHistoryRequest
-from telethon.tl.types import InputMessagesFilterEmpty
 from dotenv import load_dotenv
 
+from _keywords import KeywordMatcher
+from _output import JsonStreamWriter
+from _telegram import gather_bounded, EntityCache
+
 load_dotenv()
 
 API_ID = os.getenv('TELEGRAM_API_ID')
 API_HASH = os.getenv('TELEGRAM_API_HASH')
 PHONE = os.getenv('TELEGRAM_PHONE')
+SESSION_NAME = 'niemci_de4ru_session'
 
 # Extended time window - full year 2025
-SEARCH_START_DATE = datetime(2025, 1, 1)  # January 1, 2025
-SEARCH_END_DATE = datetime(2025, 12, 31)  # December 31, 2025
+# (UTC-aware: Telethon message dates are aware, naive bounds cannot be compared)
+SEARCH_START_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)  # January 1, 2025
+SEARCH_END_DATE = datetime(2025, 12, 31, tzinfo=timezone.utc)  # December 31, 2025
 
 # Extended search queries - additional Russian recruitment terms
 ADDITIONAL_QUERIES = [
@@ -97,6 +102,35 @@ ADDITIONAL_CHANNELS = [
     "@germania_vakansii",
 ]
 
+# Language markers in priority order: the first language with a hit wins
+HISTORY_LANGUAGE_MATCHER = KeywordMatcher({
+    "russian": ["работа", "вакансия", "требуется", "зарплата", "трудоустройство"],
+    "ukrainian": ["робота", "вакансія", "зарплата"],
+    "german": ["arbeit", "stelle", "gesucht"],
+})
+
+def detect_language(text_lower: str) -> str:
+    """Return the first language in HISTORY_LANGUAGE_MATCHER order found in text_lower, else "other"."""
+    return HISTORY_LANGUAGE_MATCHER.first(text_lower, "other")
+
+# Newest messages per channel kept even without a query match (the recent-
+# history sample the original GetHistoryRequest(limit=200) collected)
+HISTORY_SAMPLE_SIZE = 200
+
+# Queries are matched locally against the downloaded history instead of one
+# SearchRequest per query per channel. A query matches when all of its words
+# (single-letter prepositions dropped) occur in the message.
+QUERY_TERMS = [
+    (query, frozenset(word for word in query.lower().split() if len(word) > 1))
+    for query in ADDITIONAL_QUERIES
+]
+QUERY_TERM_MATCHER = KeywordMatcher({word for _, words in QUERY_TERMS for word in words})
+
+def match_queries(text_lower: str) -> list:
+    """Return the ADDITIONAL_QUERIES whose words all occur in text_lower."""
+    found = QUERY_TERM_MATCHER.matches(text_lower)
+    return [query for query, words in QUERY_TERMS if words <= found]
+
 async def extended_telegram_search():
     """
     Extended search for Russian recruitment activity in Berlin 2025.
@@ -106,7 +140,8 @@ async def extended_telegram_search():
     print(f"[*] Additional queries: {len(ADDITIONAL_QUERIES)}")
     print(f"[*] Additional channels: {len(ADDITIONAL_CHANNELS)}")
     
-    client = TelegramClient('niemci_de4ru_session', API_ID, API_HASH)
+    client = TelegramClient(SESSION_NAME, API_ID, API_HASH)
+    entities = EntityCache(SESSION_NAME)
     await client.start(phone=PHONE)
     print("[+] Telegram client authenticated")
     
@@ -121,140 +156,86 @@ async def extended_telegram_search():
         "timestamp": datetime.now().isoformat(),
         "accessible_channels": [],
         "inaccessible_channels": [],
-        "messages": [],
         "statistics": {
             "total_messages": 0,
             "by_channel": {},
-            "by_query": {},
+            "by_query": {query: 0 for query in ADDITIONAL_QUERIES},
             "by_language": {"russian": 0, "ukrainian": 0, "german": 0, "other": 0},
             "by_month": {}
         }
     }
     
-    # Search each channel
-    for channel_username in ADDITIONAL_CHANNELS:
+    # Hot-path counters, merged into results["statistics"] once at the end
+    by_language = Counter(results["statistics"]["by_language"])
+    by_query = Counter(results["statistics"]["by_query"])
+    by_month = Counter()
+    
+    report_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = f"reports/{report_id}_telegram_extended_recruitment_berlin_2025"
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(f"{output_dir}/raw_data", exist_ok=True)
+    output_file = f"{output_dir}/telegram_extended_search_{report_id}.json"
+
+    # Search each channel (bounded concurrency on one client)
+    async def search_channel(channel_username):
         print(f"\n[*] Searching channel: {channel_username}")
         
         try:
-            channel = await client.get_entity(channel_username)
+            channel = await entities.resolve(client, channel_username)
             channel_messages = []
             
-            # Try history scan first (get recent messages)
+            # Scan the full search window; iter_messages pages through history
+            # newest-first in batches of 100 until we pass SEARCH_START_DATE.
+            # Kept: the newest HISTORY_SAMPLE_SIZE messages plus every query hit
+            scanned = 0
             try:
-                history = await client(GetHistoryRequest(
-                    peer=channel,
-                    limit=200,
-                    offset_date=SEARCH_END_DATE,
-                    offset_id=0,
-                    max_id=0,
-                    min_id=0,
-                    add_offset=0,
-                    hash=0
-                ))
-                
-                for message in history.messages:
-                    if message.date >= SEARCH_START_DATE and message.date <= SEARCH_END_DATE:
-                        message_data = {
-                            "channel": channel_username,
-                            "message_id": message.id,
-                            "date": message.date.isoformat(),
-                            "text": message.message if hasattr(message, 'message') else str(message),
-                            "query": "_history_scan",
-                            "views": getattr(message, 'views', 0),
-                            "forwards": getattr(message, 'forwards', 0),
-                        }
-                        
-                        # Language detection
-                        text = message_data["text"].lower() if message_data["text"] else ""
-                        if any(word in text for word in ["работа", "вакансия", "требуется", "зарплата", "трудоустройство"]):
-                            message_data["language"] = "russian"
-                            results["statistics"]["by_language"]["russian"] += 1
-                        elif any(word in text for word in ["робота", "вакансія", "зарплата"]):
-                            message_data["language"] = "ukrainian"
-                            results["statistics"]["by_language"]["ukrainian"] += 1
-                        elif any(word in text for word in ["arbeit", "stelle", "gesucht"]):
-                            message_data["language"] = "german"
-                            results["statistics"]["by_language"]["german"] += 1
-                        else:
-                            message_data["language"] = "other"
-                            results["statistics"]["by_language"]["other"] += 1
-                        
-                        # Track by month
-                        month_key = message.date.strftime("%Y-%m")
-                        results["statistics"]["by_month"][month_key] = results["statistics"]["by_month"].get(month_key, 0) + 1
-                        
-                        channel_messages.append(message_data)
-                        results["messages"].append(message_data)
-                        
-            except Exception as e:
-                print(f"    [-] History scan error: {e}")
-            
-            # Search specific queries
-            for query in ADDITIONAL_QUERIES:
-                print(f"  [*] Query: '{query}'")
-                
-                try:
-                    result = await client(SearchRequest(
-                        peer=channel,
-                        q=query,
-                        filter=InputMessagesFilterEmpty(),
-                        min_date=SEARCH_START_DATE,
-                        max_date=SEARCH_END_DATE,
-                        offset_id=0,
-                        add_offset=0,
-                        limit=100,
-                        max_id=0,
-                        min_id=0,
-                        hash=0
-                    ))
+                async for message in client.iter_messages(channel, offset_date=SEARCH_END_DATE):
+                    if message.date < SEARCH_START_DATE:
+                        break
+                    scanned += 1
+                    text = message.message.lower() if message.message else ""
                     
-                    for message in result.messages:
-                        if message.date >= SEARCH_START_DATE and message.date <= SEARCH_END_DATE:
-                            # Check if not already from history
-                            existing_ids = [(m["channel"], m["message_id"]) for m in channel_messages]
-                            if (channel_username, message.id) not in existing_ids:
-                                message_data = {
-                                    "channel": channel_username,
-                                    "message_id": message.id,
-                                    "date": message.date.isoformat(),
-                                    "text": message.message,
-                                    "query": query,
-                                    "views": getattr(message, 'views', 0),
-                                    "forwards": getattr(message, 'forwards', 0),
-                                }
-                                
-                                # Language detection
-                                text = message.message.lower() if message.message else ""
-                                if any(word in text for word in ["работа", "вакансия", "требуется"]):
-                                    message_data["language"] = "russian"
-                                    results["statistics"]["by_language"]["russian"] += 1
-                                elif any(word in text for word in ["робота", "вакансія"]):
-                                    message_data["language"] = "ukrainian"
-                                    results["statistics"]["by_language"]["ukrainian"] += 1
-                                else:
-                                    message_data["language"] = "other"
-                                    results["statistics"]["by_language"]["other"] += 1
-                                
-                                # Track by month
-                                month_key = message.date.strftime("%Y-%m")
-                                results["statistics"]["by_month"][month_key] = results["statistics"]["by_month"].get(month_key, 0) + 1
-                                
-                                channel_messages.append(message_data)
-                                results["messages"].append(message_data)
+                    # Match search queries locally against the scanned text
+                    matched_queries = match_queries(text)
+                    if not matched_queries and scanned > HISTORY_SAMPLE_SIZE:
+                        continue
+                    for query in matched_queries:
+                        by_query[query] += 1
                     
-                    query_count = len([m for m in result.messages if m.date >= SEARCH_START_DATE and m.date <= SEARCH_END_DATE])
-                    results["statistics"]["by_query"][query] = results["statistics"]["by_query"].get(query, 0) + query_count
-                    print(f"    [+] Found {query_count} messages")
+                    message_data = {
+                        "channel": channel_username,
+                        "message_id": message.id,
+                        "date": message.date,
+                        "text": message.message if hasattr(message, 'message') else str(message),
+                        # Query hits are attributed to the first query that matches,
+                        # as the per-query search did
+                        "query": matched_queries[0] if matched_queries else "_history_scan",
+                        "views": getattr(message, 'views', 0) or 0,
+                        "forwards": getattr(message, 'forwards', 0) or 0,
+                    }
                     
-                except Exception as e:
-                    print(f"    [-] Error: {e}")
-                    continue
+                    # Language detection
+                    language = detect_language(text)
+                    message_data["language"] = language
+                    by_language[language] += 1
+                    
+                    # Track by month
+                    month_key = f"{message.date.year:04d}-{message.date.month:02d}"
+                    by_month[month_key] += 1
+                    
+                    channel_messages.append(message_data)
+                    
+            except Exception as e:
+                print(f"    [-] History scan error: {e}")
+            
+            # One write per channel rather than one per message
+            await out.extend_async(channel_messages)
             
             # Update channel statistics
             results["statistics"]["by_channel"][channel_username] = len(channel_messages)
             results["accessible_channels"].append({
                 "username": channel_username,
-                "title": getattr(channel, 'title', channel_username),
+                "title": entities.title(channel_username, getattr(channel, 'title', channel_username)),
                 "message_count": len(channel_messages)
             })
             print(f"  [+] Total from {channel_username}: {len(channel_messages)} messages")
@@ -266,25 +247,32 @@ async def extended_telegram_search():
                 "error": str(e)
             })
             results["statistics"]["by_channel"][channel_username] = 0
-            continue
-    
-    # Update totals
-    results["statistics"]["total_messages"] = len(results["messages"])
-    
-    # Save results
-    report_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = f"reports/{report_id}_telegram_extended_recruitment_berlin_2025"
-    os.makedirs(output_dir, exist_ok=True)
-    os.makedirs(f"{output_dir}/raw_data", exist_ok=True)
-    
-    output_file = f"{output_dir}/telegram_extended_search_{report_id}.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+            return
+
+    # Messages are streamed to disk as they are found; summary keys follow them
+    with JsonStreamWriter(output_file) as out:
+        for key in ("investigation", "search_period", "search_queries", "channels_searched", "timestamp"):
+            out.write(key, results[key])
+        out.begin("messages")
+        await gather_bounded(search_channel, ADDITIONAL_CHANNELS)
+        out.end()
+
+        # Update totals
+        results["statistics"]["total_messages"] = sum(results["statistics"]["by_channel"].values())
+        results["statistics"].update(
+            by_query=dict(by_query),
+            by_language=dict(by_language),
+            by_month=dict(by_month),
+        )
+        for key in ("accessible_channels", "inaccessible_channels", "statistics"):
+            out.write(key, results[key])
     
-    # Also save to raw_data for persistence
+    # Also save to raw_data for persistence (hard link: same bytes, no second write)
     raw_file = f"{output_dir}/raw_data/telegram_recruitment_extended_{report_id}.json"
-    with open(raw_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    try:
+        os.link(output_file, raw_file)
+    except OSError:
+        shutil.copyfile(output_file, raw_file)
     
     print(f"\n{'='*60}")
     print(f"[+] Search complete!")
@@ -296,6 +284,7 @@ async def extended_telegram_search():
     print(f"[+] Messages by month: {results['statistics']['by_month']}")
     print(f"{'='*60}")
     
+    entities.save()
     await client.disconnect()
     return results
 
@@ -7,22 +7,27 @@ Channels: @Niemci (Layboard Germany), DE4RU (Работа в Германии)
 Compliance: OSINT SOP v2.3 / Persistence SOP v1.0
 """
 
-import asyncio
-import json
 import os
 import hashlib
+import heapq
+import re
+import shutil
+from collections import Counter
 from datetime import datetime, timezone
 from telethon import TelegramClient
-from telethon.tl.functions.messages import SearchRequest, GetHistoryRequest
-from telethon.tl.types import InputMessagesFilterEmpty
 from dotenv import load_dotenv
 
+from _keywords import KeywordMatcher
+from _output import JsonStreamWriter
+from _telegram import gather_bounded, EntityCache, run
+
 # ─── Configuration ───
 load_dotenv()
 
 API_ID = os.getenv('TELEGRAM_API_ID')
 API_HASH = os.getenv('TELEGRAM_API_HASH')
 PHONE = os.getenv('TELEGRAM_PHONE')
+SESSION_NAME = 'niemci_de4ru_session'
 
 # Investigation window: October 1, 2025 – January 10, 2026
 SEARCH_START = datetime(2025, 10, 1, tzinfo=timezone.utc)
@@ -142,6 +147,14 @@ ALL_QUERIES = (
     SUBCONTRACTOR_QUERIES
 )
 
+# Queries are matched locally against the scanned history. A query matches
+# when all of its words (single letters dropped) occur in the message.
+QUERY_TERMS = [
+    (query, frozenset(word for word in query.lower().split() if len(word) > 1))
+    for query in ALL_QUERIES
+]
+QUERY_TERM_MATCHER = KeywordMatcher({word for _, words in QUERY_TERMS for word in words})
+
 # ─── Red Flag Keywords ───
 RED_FLAG_KEYWORDS = [
     # Location red flags
@@ -160,6 +173,80 @@ RED_FLAG_KEYWORDS = [
     "strabag", "stratieka", "boran", "planmann",
 ]
 
+# ─── Classification Keywords ───
+# Label order is priority: the first language / recruitment type with a hit wins
+LANGUAGE_KEYWORDS = {
+    "russian": ["работа", "вакансия", "требуется", "зарплата", "опыт"],
+    "ukrainian": ["робота", "вакансія", "зарплатня"],
+    "polish": ["praca", "wynagrodzenie", "zatrudnienie"],
+    "german": ["arbeit", "gesucht", "baustelle", "gehalt"],
+}
+RECRUITMENT_TYPE_KEYWORDS = {
+    "staffing_agency": ["zeitarbeit", "personalvermittlung", "staffing", "recruitment", "agency"],
+    "subcontractor": ["subunternehmer", "nachunternehmer", "подрядчик"],
+    "direct_hire": ["direkt", "einstellung", "прямой наём", "direct"],
+    "helper_role": ["helfer", "подсобник", "helper", "pomoc"],
+}
+HOUSING_KEYWORDS = ["жилье", "проживание", "unterkunft", "housing", "wohnung", "zakwaterowanie"]
+NO_LANGUAGE_KEYWORDS = ["без немецкого", "ohne deutsch", "no german", "без языка", "bez języka"]
+# Construction/recruitment stems that make an unmatched history message worth keeping
+RELEVANCE_KEYWORDS = [
+    "bau", "elektr", "montag", "install", "gerüst", "scaffold",
+    "строй", "электр", "монтаж", "кабел", "подсоб",
+    "helfer", "arbeiter", "работ", "вакан",
+    "berlin", "берлин",
+]
+
+# Every classification keyword in one matcher, labelled (category, value),
+# so classify_message() scans each text once
+CLASSIFY_MATCHER = KeywordMatcher({
+    **{("language", lang): words for lang, words in LANGUAGE_KEYWORDS.items()},
+    **{("recruitment_type", rt): words for rt, words in RECRUITMENT_TYPE_KEYWORDS.items()},
+    **{("red_flag", kw): [kw] for kw in RED_FLAG_KEYWORDS},
+    ("mentions", "housing"): HOUSING_KEYWORDS,
+    ("mentions", "no_language"): NO_LANGUAGE_KEYWORDS,
+    ("mentions", "relevance"): RELEVANCE_KEYWORDS,
+})
+
+# Phone-like run: digits joined by up to 3 space/dash/slash/parenthesis/dot
+# separators. Either "+" and at least 6 digits, or at least 9 digits starting
+# a run (not after a letter or another digit group) that is not a date or a
+# postcode followed by a house number.
+#   counted:     "+49 (30) 1234567", "030/12345678", "+49 176 / 123 4567",
+#                "0176 1234567", "+7 999 123-45-67"
+#   not counted: "2025-11-01 12:30", "01.11.2025 15:30", "01-11-2025 1530",
+#                "10115 1234", "1 500 000", "DE89 3704 0044 0532 0130 00"
+PHONE_RE = re.compile(
+    r"\+\d(?:[\s\-/().]{0,3}\d){5,}"
+    r"|(?<![\w\-/])(?<!\d[\s\-/().])(?<!\d[\s\-/().]{2})(?<!\d[\s\-/().]{3})"
+    r"(?!\d{4}[./-]\d{2}[./-]\d{2}(?!\d)|\d{1,2}[./-]\d{1,2}[./-]\d{2,4}(?!\d)|\d{5}\s\d{1,4}(?![\s\-/().]{0,3}\d))"
+    r"\d(?:[\s\-/().]{0,3}\d){8,}"
+)
+
+# Texts shorter than the shortest keyword (or a "+" and 6-digit phone run)
+# cannot match anything and get the empty classification without a scan
+MIN_CLASSIFIABLE_LEN = min(
+    7,
+    *(len(w) for words in LANGUAGE_KEYWORDS.values() for w in words),
+    *(len(w) for words in RECRUITMENT_TYPE_KEYWORDS.values() for w in words),
+    *(len(w) for w in RED_FLAG_KEYWORDS + HOUSING_KEYWORDS + NO_LANGUAGE_KEYWORDS + RELEVANCE_KEYWORDS),
+)
+EMPTY_CLASSIFICATION = {
+    "language": "other",
+    "recruitment_type": "general",
+    "red_flags": [],
+    "red_flag_score": 0,
+    "contains_phone_number": False,
+    "mentions_housing": False,
+    "mentions_no_language_required": False,
+}
+
+
+def match_queries(text_lower: str) -> list:
+    """Return the ALL_QUERIES entries whose words all occur in text_lower, in priority order."""
+    found = QUERY_TERM_MATCHER.matches(text_lower)
+    return [query for query, words in QUERY_TERMS if words <= found]
+
 
 def compute_doc_id(channel: str, message_id: int) -> str:
     """SHA256 hash for Elasticsearch dedup per Persistence SOP."""
@@ -167,46 +254,35 @@ def compute_doc_id(channel: str, message_id: int) -> str:
     return hashlib.sha256(raw.encode()).hexdigest()
 
 
-def classify_message(text: str) -> dict:
-    """Classify a message by language, recruitment type, and red flags."""
-    text_lower = text.lower() if text else ""
+def classify_message(text_lower: str) -> tuple:
+    """
+    Classify an already-lowercased message by language, recruitment type, and red flags.
+
+    Returns:
+        (classification, has_relevance): the stored classification fields, and
+        whether a RELEVANCE_KEYWORDS stem occurs (used to filter, not stored)
+    """
+    if len(text_lower) < MIN_CLASSIFIABLE_LEN:
+        return {**EMPTY_CLASSIFICATION, "red_flags": []}, False
+
+    found = CLASSIFY_MATCHER.matches(text_lower)
 
     # Language detection
-    lang = "unknown"
-    if any(w in text_lower for w in ["работа", "вакансия", "требуется", "зарплата", "опыт"]):
-        lang = "russian"
-    elif any(w in text_lower for w in ["робота", "вакансія", "зарплатня"]):
-        lang = "ukrainian"
-    elif any(w in text_lower for w in ["praca", "wynagrodzenie", "zatrudnienie"]):
-        lang = "polish"
-    elif any(w in text_lower for w in ["arbeit", "gesucht", "baustelle", "gehalt"]):
-        lang = "german"
-    else:
-        lang = "other"
+    lang = next((l for l in LANGUAGE_KEYWORDS if ("language", l) in found), "other")
 
     # Recruitment type
-    recruitment_type = "general"
-    if any(w in text_lower for w in ["zeitarbeit", "personalvermittlung", "staffing", "recruitment", "agency"]):
-        recruitment_type = "staffing_agency"
-    elif any(w in text_lower for w in ["subunternehmer", "nachunternehmer", "подрядчик"]):
-        recruitment_type = "subcontractor"
-    elif any(w in text_lower for w in ["direkt", "einstellung", "прямой наём", "direct"]):
-        recruitment_type = "direct_hire"
-    elif any(w in text_lower for w in ["helfer", "подсобник", "helper", "pomoc"]):
-        recruitment_type = "helper_role"
-
-    # Red flag scoring
-    red_flags_found = [kw for kw in RED_FLAG_KEYWORDS if kw in text_lower]
+    recruitment_type = next(
+        (rt for rt in RECRUITMENT_TYPE_KEYWORDS if ("recruitment_type", rt) in found), "general"
+    )
+
+    # Red flag scoring (reported in RED_FLAG_KEYWORDS order)
+    red_flags_found = [kw for kw in RED_FLAG_KEYWORDS if ("red_flag", kw) in found]
     red_flag_score = min(len(red_flags_found), 10)
 
     # Specific pattern detection
-    contains_phone = any(c.isdigit() and text_lower.count(c) > 5 for c in "0123456789") or "+" in text_lower
-    mentions_housing = any(w in text_lower for w in [
-        "жилье", "проживание", "unterkunft", "housing", "wohnung", "zakwaterowanie"
-    ])
-    mentions_no_language = any(w in text_lower for w in [
-        "без немецкого", "ohne deutsch", "no german", "без языка", "bez języka"
-    ])
+    contains_phone = PHONE_RE.search(text_lower) is not None
+    mentions_housing = ("mentions", "housing") in found
+    mentions_no_language = ("mentions", "no_language") in found
 
     return {
         "language": lang,
@@ -216,11 +292,37 @@ def classify_message(text: str) -> dict:
         "contains_phone_number": contains_phone,
         "mentions_housing": mentions_housing,
         "mentions_no_language_required": mentions_no_language,
-    }
-
-
-async def search_channel(client, channel_name: str, queries: list, results: dict):
-    """Search a single channel with all queries."""
+    }, ("mentions", "relevance") in found
+
+
+def message_record(msg, channel_name: str, matched_query: str, classification: dict) -> dict:
+    """
+    Build the stored record for a Telethon message (Message always has views/forwards/reply_to).
+
+    The record is classification itself, filled in place: classify_message()
+    returns a fresh dict per message, so no copy is needed.
+    """
+    reply_to = msg.reply_to
+    record = classification
+    record["doc_id"] = compute_doc_id(channel_name, msg.id)
+    record["message_id"] = msg.id
+    record["date"] = msg.date
+    record["text"] = msg.message
+    record["matched_query"] = matched_query
+    record["views"] = msg.views or 0
+    record["forwards"] = msg.forwards or 0
+    record["reply_to"] = reply_to.reply_to_msg_id if reply_to else None
+    return record
+
+
+async def search_channel(client, entities, channel_name: str, entity, results: dict):
+    """
+    Scan a single channel's history in the window and match ALL_QUERIES locally.
+
+    Args:
+        entities: EntityCache the channel was resolved through (for its title)
+        entity: The resolved channel peer, or the exception raised resolving it
+    """
     print(f"\n{'='*60}")
     print(f"[*] CHANNEL: {channel_name}")
     print(f"{'='*60}")
@@ -233,176 +335,65 @@ async def search_channel(client, channel_name: str, queries: list, results: dict
         "errors": [],
     }
 
-    try:
-        entity = await client.get_entity(channel_name)
-        channel_data["status"] = "accessible"
-        channel_data["channel_title"] = getattr(entity, 'title', channel_name)
-        channel_data["channel_id"] = entity.id
-        channel_data["participants_count"] = getattr(entity, 'participants_count', None)
-        print(f"  [+] Connected: {channel_data['channel_title']} (ID: {entity.id})")
-        if channel_data["participants_count"]:
-            print(f"  [+] Members: {channel_data['participants_count']}")
-    except Exception as e:
+    if isinstance(entity, Exception):
         channel_data["status"] = "inaccessible"
-        channel_data["errors"].append(f"Cannot access channel: {str(e)}")
-        print(f"  [-] FAILED: {e}")
+        channel_data["errors"].append(f"Cannot access channel: {str(entity)}")
+        print(f"  [-] FAILED: {entity}")
         results["channels"][channel_name] = channel_data
         return
 
-    seen_ids = set()
-
-    for query in queries:
-        try:
-            search_result = await client(SearchRequest(
-                peer=entity,
-                q=query,
-                filter=InputMessagesFilterEmpty(),
-                min_date=SEARCH_START,
-                max_date=SEARCH_END,
-                offset_id=0,
-                add_offset=0,
-                limit=100,
-                max_id=0,
-                min_id=0,
-                hash=0
-            ))
-
-            new_count = 0
-            for msg in search_result.messages:
-                if msg.id in seen_ids:
-                    continue
-                if not msg.message:
-                    continue
-                if msg.date < SEARCH_START or msg.date > SEARCH_END:
-                    continue
-
-                seen_ids.add(msg.id)
-                new_count += 1
-
-                classification = classify_message(msg.message)
-
-                message_data = {
-                    "doc_id": compute_doc_id(channel_name, msg.id),
-                    "message_id": msg.id,
-                    "date": msg.date.isoformat(),
-                    "text": msg.message,
-                    "matched_query": query,
-                    "views": getattr(msg, 'views', 0),
-                    "forwards": getattr(msg, 'forwards', 0),
-                    "reply_to": msg.reply_to.reply_to_msg_id if msg.reply_to else None,
-                    **classification,
-                }
-
-                channel_data["messages"].append(message_data)
-
-                # Print high-priority findings immediately
-                if classification["red_flag_score"] >= 3:
-                    print(f"  🔴 HIGH RED FLAG (score={classification['red_flag_score']}): "
-                          f"msg_id={msg.id}, date={msg.date.date()}")
-                    print(f"     Flags: {classification['red_flags']}")
-                    print(f"     Text: {msg.message[:200]}...")
-
-            if new_count > 0:
-                print(f"  [+] Query '{query}': {new_count} new messages")
-
-            # Rate limiting
-            await asyncio.sleep(0.5)
-
-        except Exception as e:
-            err_msg = f"Query '{query}': {str(e)}"
-            channel_data["errors"].append(err_msg)
-            if "FLOOD" in str(e).upper():
-                print(f"  [⚠] FLOOD WAIT — sleeping 30s")
-                await asyncio.sleep(30)
-            continue
-
-    # Also pull recent channel history (last 500 messages in window)
-    print(f"\n  [*] Pulling full channel history (within investigation window)...")
+    channel_data["status"] = "accessible"
+    channel_data["channel_title"] = entities.title(channel_name, getattr(entity, 'title', channel_name))
+    # Full Channel entities carry .id; cached InputPeerChannel peers carry .channel_id
+    channel_data["channel_id"] = getattr(entity, 'id', None) or getattr(entity, 'channel_id', None)
+    channel_data["participants_count"] = getattr(entity, 'participants_count', None)
+    print(f"  [+] Connected: {channel_data['channel_title']} (ID: {channel_data['channel_id']})")
+    if channel_data["participants_count"]:
+        print(f"  [+] Members: {channel_data['participants_count']}")
+
+    # One pass over the channel history in the investigation window. Queries
+    # are matched locally (match_queries) instead of one SearchRequest each;
+    # messages no query matches are kept if they look relevant.
+    print(f"  [*] Scanning channel history (within investigation window)...")
+    query_hits = 0
     try:
-        history_offset_id = 0
-        history_batch = 0
-        while True:
-            history = await client(GetHistoryRequest(
-                peer=entity,
-                offset_id=history_offset_id,
-                offset_date=SEARCH_END,
-                add_offset=0,
-                limit=100,
-                max_id=0,
-                min_id=0,
-                hash=0
-            ))
-            if not history.messages:
-                break
-
-            batch_new = 0
-            for msg in history.messages:
-                if msg.id in seen_ids:
-                    continue
-                if not msg.message:
-                    continue
-                if msg.date < SEARCH_START:
-                    # We've gone past our window
-                    history_offset_id = 0  # Signal to stop
-                    break
-                if msg.date > SEARCH_END:
-                    continue
-
-                seen_ids.add(msg.id)
-                classification = classify_message(msg.message)
-
-                # Only keep messages with construction/recruitment relevance
-                text_lower = msg.message.lower()
-                is_relevant = (
-                    classification["red_flag_score"] > 0 or
-                    any(kw in text_lower for kw in [
-                        "bau", "elektr", "montag", "install", "gerüst", "scaffold",
-                        "строй", "электр", "монтаж", "кабел", "подсоб",
-                        "helfer", "arbeiter", "работ", "вакан",
-                        "berlin", "берлин",
-                    ])
-                )
-
-                if is_relevant:
-                    batch_new += 1
-                    message_data = {
-                        "doc_id": compute_doc_id(channel_name, msg.id),
-                        "message_id": msg.id,
-                        "date": msg.date.isoformat(),
-                        "text": msg.message,
-                        "matched_query": "_history_scan",
-                        "views": getattr(msg, 'views', 0),
-                        "forwards": getattr(msg, 'forwards', 0),
-                        "reply_to": msg.reply_to.reply_to_msg_id if msg.reply_to else None,
-                        **classification,
-                    }
-                    channel_data["messages"].append(message_data)
-
-                    if classification["red_flag_score"] >= 3:
-                        print(f"  🔴 HISTORY HIT (score={classification['red_flag_score']}): "
-                              f"msg_id={msg.id}, date={msg.date.date()}")
-                        print(f"     Flags: {classification['red_flags']}")
-                        print(f"     Text: {msg.message[:200]}...")
-
-            history_batch += 1
-            if batch_new > 0:
-                print(f"  [+] History batch {history_batch}: {batch_new} relevant messages")
-
-            if history_offset_id == 0:
-                break  # Signal from inner loop
-            history_offset_id = history.messages[-1].id
-
-            # Cap at 2000 messages (20 batches)
-            if history_batch >= 20:
-                print(f"  [*] Hit history cap (2000 messages)")
+        async for msg in client.iter_messages(entity, offset_date=SEARCH_END):
+            if msg.date < SEARCH_START:
                 break
-
-            await asyncio.sleep(0.3)
+            if not msg.message:
+                continue
+
+            # Lowercased once; classification and query matching share it
+            text_lower = msg.message.lower()
+            classification, has_relevance = classify_message(text_lower)
+
+            matched = match_queries(text_lower)
+            if matched:
+                matched_query = matched[0]
+                query_hits += 1
+            elif classification["red_flag_score"] > 0 or has_relevance:
+                # Only keep unmatched messages with construction/recruitment relevance
+                matched_query = "_history_scan"
+            else:
+                continue
+
+            message_data = message_record(msg, channel_name, matched_query, classification)
+            channel_data["messages"].append(message_data)
+
+            # Print high-priority findings immediately
+            if classification["red_flag_score"] >= 3:
+                print(f"  🔴 HIGH RED FLAG (score={classification['red_flag_score']}): "
+                      f"msg_id={msg.id}, date={msg.date.date()}")
+                print(f"     Flags: {classification['red_flags']}")
+                print(f"     Text: {msg.message[:200]}...")
 
     except Exception as e:
         channel_data["errors"].append(f"History scan: {str(e)}")
         print(f"  [-] History scan error: {e}")
 
+    print(f"  [+] {channel_name}: {query_hits} query matches, "
+          f"{len(channel_data['messages']) - query_hits} other relevant messages")
+
     channel_data["total_messages"] = len(channel_data["messages"])
     results["channels"][channel_name] = channel_data
     print(f"\n  [=] TOTAL for {channel_name}: {channel_data['total_messages']} messages collected")
@@ -418,18 +409,33 @@ async def main():
     print("=" * 70)
 
     client = TelegramClient(
-        'niemci_de4ru_session',
+        SESSION_NAME,
         int(API_ID),
         API_HASH
     )
     await client.start(phone=PHONE)
     print("[+] Telegram client authenticated\n")
 
+    # Resolve every channel up front (bounded concurrency); peers resolved on
+    # earlier runs come from the entity cache without a round trip. A failure
+    # is kept as the channel's entry and reported by search_channel()
+    entities = EntityCache(SESSION_NAME)
+
+    async def resolve_channel(channel):
+        try:
+            return await entities.resolve(client, channel)
+        except Exception as e:
+            return e
+
+    resolved = await gather_bounded(resolve_channel, TARGET_CHANNELS)
+    entity_by_channel = dict(zip(TARGET_CHANNELS, resolved))
+    entities.save()
+
     results = {
         "investigation": "Berlin Grid Attack — Operation EG VOLT",
         "collection_type": "Telegram Channel Monitoring (@Niemci, DE4RU)",
         "search_timestamp": datetime.now().isoformat(),
-        "search_method": "Telethon API (SearchRequest + GetHistoryRequest)",
+        "search_method": "Telethon API (channel history scan + local query matching)",
         "search_period": {
             "start": SEARCH_START.isoformat(),
             "end": SEARCH_END.isoformat(),
@@ -452,40 +458,7 @@ async def main():
         },
     }
 
-    # Search all channels
-    for channel in TARGET_CHANNELS:
-        await search_channel(client, channel, ALL_QUERIES, results)
-        await asyncio.sleep(1)  # Inter-channel rate limit
-
-    # ─── Aggregate Statistics ───
-    all_messages = []
-    for ch_name, ch_data in results["channels"].items():
-        all_messages.extend(ch_data.get("messages", []))
-
-    results["statistics"]["total_messages"] = len(all_messages)
-
-    # Language breakdown
-    lang_counts = {}
-    for m in all_messages:
-        lang = m.get("language", "unknown")
-        lang_counts[lang] = lang_counts.get(lang, 0) + 1
-    results["statistics"]["by_language"] = lang_counts
-
-    # Recruitment type breakdown
-    type_counts = {}
-    for m in all_messages:
-        rt = m.get("recruitment_type", "unknown")
-        type_counts[rt] = type_counts.get(rt, 0) + 1
-    results["statistics"]["by_recruitment_type"] = type_counts
-
-    # High-priority findings (red_flag_score >= 3)
-    high_priority = [m for m in all_messages if m.get("red_flag_score", 0) >= 3]
-    results["statistics"]["total_red_flag_messages"] = len(high_priority)
-    results["statistics"]["high_priority_findings"] = sorted(
-        high_priority, key=lambda x: x.get("red_flag_score", 0), reverse=True
-    )[:50]  # Top 50
-
-    # ─── Save Results ───
+    # ─── Output Files ───
     output_dir = "reports/20260213_142123_berlin_grid_attack_eg_volt/osint_construction"
     os.makedirs(output_dir, exist_ok=True)
 
@@ -497,9 +470,62 @@ async def main():
     output_file = os.path.join(output_dir, f"11_telegram_niemci_de4ru_{timestamp_str}.json")
     raw_file = os.path.join(raw_dir, f"telegram_niemci_de4ru_{timestamp_str}.json")
 
-    for filepath in [output_file, raw_file]:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+    lang_counts = Counter()
+    type_counts = Counter()
+    # Top-50 red-flag findings as a min-heap of (score, -channel index, -message index, message),
+    # so ties keep TARGET_CHANNELS and collection order like a stable sort would
+    top_findings = []
+
+    # Each channel is written to disk as it finishes and its messages are
+    # dropped from memory; statistics are aggregated on the way
+    async def run_channel(channel):
+        await search_channel(client, entities, channel, entity_by_channel[channel], results)
+        ch_data = results["channels"][channel]
+        await out.put_async(channel, ch_data)
+
+        messages = ch_data.pop("messages")
+        channel_index = TARGET_CHANNELS.index(channel)
+        stats = results["statistics"]
+        stats["total_messages"] += len(messages)
+        for i, m in enumerate(messages):
+            lang_counts[m["language"]] += 1
+            type_counts[m["recruitment_type"]] += 1
+            score = m["red_flag_score"]
+            if score >= 3:
+                stats["total_red_flag_messages"] += 1
+                entry = (score, -channel_index, -i, m)
+                if len(top_findings) < 50:
+                    heapq.heappush(top_findings, entry)
+                else:
+                    heapq.heappushpop(top_findings, entry)
+
+    # Search all channels (bounded concurrency on one client)
+    with JsonStreamWriter(output_file) as out:
+        for key in ("investigation", "collection_type", "search_timestamp", "search_method",
+                    "search_period", "target_channels", "query_categories"):
+            out.write(key, results[key])
+        out.begin("channels", dict)
+        await gather_bounded(run_channel, TARGET_CHANNELS)
+        out.end()
+
+        # ─── Aggregate Statistics ───
+        results["statistics"]["by_language"] = dict(lang_counts)
+        results["statistics"]["by_recruitment_type"] = dict(type_counts)
+
+        # High-priority findings (red_flag_score >= 3), top 50 by score
+        results["statistics"]["high_priority_findings"] = [
+            m for *_, m in sorted(top_findings, key=lambda e: e[:3], reverse=True)
+        ]
+        out.write("statistics", results["statistics"])
+
+    # Channels finish in any order; summarize them in TARGET_CHANNELS order
+    results["channels"] = {ch: results["channels"][ch] for ch in TARGET_CHANNELS}
+
+    # Same bytes for the raw copy (hard link: no second write)
+    try:
+        os.link(output_file, raw_file)
+    except OSError:
+        shutil.copyfile(output_file, raw_file)
 
     # ─── Print Summary ───
     print("\n" + "=" * 70)
@@ -521,10 +547,10 @@ async def main():
         emoji = "✅" if status == "accessible" else "❌"
         print(f"    {emoji} {ch_name}: {status} ({total} messages)")
 
-    if high_priority:
+    if results["statistics"]["high_priority_findings"]:
         print(f"\n  🔴 TOP RED FLAG FINDINGS:")
         for hp in results["statistics"]["high_priority_findings"][:10]:
-            print(f"    Score {hp['red_flag_score']}: [{hp['date'][:10]}] "
+            print(f"    Score {hp['red_flag_score']}: [{hp['date']:%Y-%m-%d}] "
                   f"{hp.get('channel', '?')}: {hp['text'][:120]}...")
 
     print(f"\n  [+] Results saved to: {output_file}")
@@ -535,4 +561,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -5,14 +5,17 @@ Focus on @Niemci (Layboard.com) channel with additional Russian recruitment term
 """
 
 import asyncio
-import json
 import os
+import shutil
 from datetime import datetime, timezone
 from telethon import TelegramClient
 from telethon.tl.functions.messages import SearchRequest, GetHistoryRequest
 from telethon.tl.types import InputMessagesFilterEmpty
 from dotenv import load_dotenv
 
+from _keywords import KeywordMatcher
+from _output import JsonStreamWriter
+
 load_dotenv()
 
 API_ID = os.getenv('TELEGRAM_API_ID')
@@ -80,6 +83,97 @@ EXTENDED_QUERIES = [
 
 TARGET_CHANNEL = "@Niemci"
 
+# ─── Classification Keywords ───
+# Label order is priority: the first language / recruitment type with a hit wins
+LANGUAGE_KEYWORDS = {
+    "russian": ["работа", "вакансия", "требуется", "зарплата", "трудоустройство", "электрик", "строитель"],
+    "ukrainian": ["робота", "вакансія"],
+    "german": ["arbeit", "stelle", "gesucht", "berlin", "germany"],
+}
+RECRUITMENT_TYPE_KEYWORDS = {
+    "electrical": ["электрик", "электромонтаж", "elektriker", "kabel", "strom"],
+    "construction": ["строитель", "бетонщик", "bauarbeiter", "bau", "construction"],
+    "general_labor": ["разнорабочий", "подсобник", "helfer", "lager"],
+    "skilled_trade": ["сантехник", "маляр", "плиточник", "installateur", "fliesen"],
+}
+HOUSING_KEYWORDS = ["жилье", "wohnung", "unterkunft", "housing"]
+NO_GERMAN_KEYWORDS = ["без немецкого", "без языка", "kein deutsch", "ohne sprache"]
+BERLIN_KEYWORDS = ["берлин", "berlin", "штеглиц", "zehlendorf", "lichterfelde"]
+
+# Queries and classification keywords in one matcher, labelled (category, value),
+# so each message is scanned once. A query matches as a whole-phrase substring.
+ANALYSIS_MATCHER = KeywordMatcher({
+    **{("query", query): [query] for query in EXTENDED_QUERIES},
+    **{("language", lang): words for lang, words in LANGUAGE_KEYWORDS.items()},
+    **{("recruitment_type", rt): words for rt, words in RECRUITMENT_TYPE_KEYWORDS.items()},
+    ("mentions", "housing"): HOUSING_KEYWORDS,
+    ("mentions", "no_german"): NO_GERMAN_KEYWORDS,
+    ("mentions", "berlin"): BERLIN_KEYWORDS,
+})
+
+def analyze_message(msg, statistics: dict) -> dict:
+    """
+    Build the report record for one text message and count it in statistics.
+
+    Args:
+        msg: Telethon message with non-empty .message
+        statistics: results["statistics"], updated in place
+    """
+    text = msg.message
+    text_lower = text.lower()
+    found = ANALYSIS_MATCHER.matches(text_lower)
+    
+    # Check if any query matches
+    matched_queries = [query for query in EXTENDED_QUERIES if ("query", query) in found]
+    
+    # Also include all messages to analyze patterns
+    message_data = {
+        "message_id": msg.id,
+        "date": msg.date,
+        "text": text,
+        "views": getattr(msg, 'views', 0),
+        "forwards": getattr(msg, 'forwards', 0),
+        "matched_queries": matched_queries,
+        "has_media": bool(getattr(msg, 'media', None))
+    }
+    
+    # Language detection
+    language = next((l for l in LANGUAGE_KEYWORDS if ("language", l) in found), "mixed")
+    message_data["language"] = language
+    statistics["by_language"][language] += 1
+    
+    # Recruitment type classification
+    recruitment_type = next(
+        (rt for rt in RECRUITMENT_TYPE_KEYWORDS if ("recruitment_type", rt) in found), "other"
+    )
+    message_data["recruitment_type"] = recruitment_type
+    statistics["by_recruitment_type"][recruitment_type] += 1
+    
+    # Red flags
+    message_data["mentions_housing"] = ("mentions", "housing") in found
+    if message_data["mentions_housing"]:
+        statistics["housing_mentioned"] += 1
+    
+    message_data["no_german_required"] = ("mentions", "no_german") in found
+    if message_data["no_german_required"]:
+        statistics["no_german_required"] += 1
+    
+    # Berlin specific
+    message_data["berlin_specific"] = ("mentions", "berlin") in found
+    if message_data["berlin_specific"]:
+        statistics["berlin_specific"] += 1
+    
+    # Track by month
+    month_key = f"{msg.date.year:04d}-{msg.date.month:02d}"  # "YYYY-MM" without strftime
+    statistics["by_month"][month_key] = statistics["by_month"].get(month_key, 0) + 1
+    
+    # Update query stats
+    for query in matched_queries:
+        statistics["by_query"][query] = statistics["by_query"].get(query, 0) + 1
+    
+    statistics["total_messages"] += 1
+    return message_data
+
 async def search_niemci_extended():
     """
     Deep search of @Niemci channel with extended queries.
@@ -101,7 +195,6 @@ async def search_niemci_extended():
         },
         "search_queries": EXTENDED_QUERIES,
         "timestamp": datetime.now().isoformat(),
-        "messages": [],
         "statistics": {
             "total_messages": 0,
             "by_query": {},
@@ -123,147 +216,70 @@ async def search_niemci_extended():
     try:
         channel = await client.get_entity(TARGET_CHANNEL)
         print(f"[+] Connected to: {getattr(channel, 'title', TARGET_CHANNEL)}")
+        # Convert to an InputPeerChannel once instead of on every history request
+        peer = await client.get_input_entity(channel)
         
-        # First, get full history for 2025
-        print("\n[*] Retrieving full channel history for 2025...")
-        all_messages = []
-        offset_id = 0
+        report_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = f"reports/{report_id}_niemci_extended_search_berlin_2025"
+        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(f"{output_dir}/raw_data", exist_ok=True)
+        output_file = f"{output_dir}/niemci_extended_analysis_{report_id}.json"
         
-        while True:
-            try:
-                history = await client(GetHistoryRequest(
-                    peer=channel,
-                    limit=100,
-                    offset_date=SEARCH_END_DATE,
-                    offset_id=offset_id,
-                    max_id=0,
-                    min_id=0,
-                    add_offset=0,
-                    hash=0
-                ))
+        # Page through the 2025 history, analyzing each batch as it arrives;
+        # analyzed batches are written on a worker thread (extend_async)
+        print("\n[*] Retrieving and analyzing channel history for 2025...")
+        statistics = results["statistics"]
+        with JsonStreamWriter(output_file) as out:
+            for key in ("investigation", "channel", "search_period", "search_queries", "timestamp"):
+                out.write(key, results[key])
+            out.begin("messages")
+            offset_id = 0
+            
+            while True:
+                try:
+                    history = await client(GetHistoryRequest(
+                        peer=peer,
+                        limit=100,
+                        offset_date=SEARCH_END_DATE,
+                        offset_id=offset_id,
+                        max_id=0,
+                        min_id=0,
+                        add_offset=0,
+                        hash=0
+                    ))
+                except Exception as e:
+                    print(f"  [-] History error: {e}")
+                    break
                 
                 if not history.messages:
                     break
                 
+                # Batches come newest-first, so the first message before the
+                # window start ends this batch and the pagination
+                batch = []
                 for msg in history.messages:
-                    if msg.date >= SEARCH_START_DATE and msg.date <= SEARCH_END_DATE:
-                        all_messages.append(msg)
-                        
-                if len(history.messages) < 100:
-                    break
-                    
-                offset_id = history.messages[-1].id
-                print(f"  [*] Retrieved {len(all_messages)} messages so far...")
-                
-            except Exception as e:
-                print(f"  [-] History error: {e}")
-                break
-        
-        print(f"[+] Total messages in 2025: {len(all_messages)}")
-        
-        # Process all messages
-        print("\n[*] Analyzing messages for recruitment content...")
-        for msg in all_messages:
-            if not hasattr(msg, 'message') or not msg.message:
-                continue
+                    if msg.date < SEARCH_START_DATE:
+                        break
+                    # Service messages and media without a caption have no text to analyze
+                    if msg.date <= SEARCH_END_DATE and getattr(msg, 'message', None):
+                        batch.append(analyze_message(msg, statistics))
+                await out.extend_async(batch)
                 
-            text = msg.message
-            text_lower = text.lower()
-            
-            # Check if any query matches
-            matched_queries = []
-            for query in EXTENDED_QUERIES:
-                query_lower = query.lower()
-                if query_lower in text_lower:
-                    matched_queries.append(query)
-            
-            # Also include all messages to analyze patterns
-            message_data = {
-                "message_id": msg.id,
-                "date": msg.date.isoformat(),
-                "text": text,
-                "views": getattr(msg, 'views', 0),
-                "forwards": getattr(msg, 'forwards', 0),
-                "matched_queries": matched_queries,
-                "has_media": bool(getattr(msg, 'media', None))
-            }
-            
-            # Language detection
-            if any(word in text_lower for word in ["работа", "вакансия", "требуется", "зарплата", "трудоустройство", "электрик", "строитель"]):
-                message_data["language"] = "russian"
-                results["statistics"]["by_language"]["russian"] += 1
-            elif any(word in text_lower for word in ["робота", "вакансія"]):
-                message_data["language"] = "ukrainian"
-                results["statistics"]["by_language"]["ukrainian"] += 1
-            elif any(word in text_lower for word in ["arbeit", "stelle", "gesucht", "berlin", "germany"]):
-                message_data["language"] = "german"
-                results["statistics"]["by_language"]["german"] += 1
-            else:
-                message_data["language"] = "mixed"
-                results["statistics"]["by_language"]["mixed"] += 1
-            
-            # Recruitment type classification
-            if any(word in text_lower for word in ["электрик", "электромонтаж", "elektriker", "kabel", "strom"]):
-                message_data["recruitment_type"] = "electrical"
-                results["statistics"]["by_recruitment_type"]["electrical"] += 1
-            elif any(word in text_lower for word in ["строитель", "бетонщик", "bauarbeiter", "bau", "construction"]):
-                message_data["recruitment_type"] = "construction"
-                results["statistics"]["by_recruitment_type"]["construction"] += 1
-            elif any(word in text_lower for word in ["разнорабочий", "подсобник", "helfer", "lager"]):
-                message_data["recruitment_type"] = "general_labor"
-                results["statistics"]["by_recruitment_type"]["general_labor"] += 1
-            elif any(word in text_lower for word in ["сантехник", "маляр", "плиточник", "installateur", "fliesen"]):
-                message_data["recruitment_type"] = "skilled_trade"
-                results["statistics"]["by_recruitment_type"]["skilled_trade"] += 1
-            else:
-                message_data["recruitment_type"] = "other"
-                results["statistics"]["by_recruitment_type"]["other"] += 1
-            
-            # Red flags
-            if any(word in text_lower for word in ["жилье", "wohnung", "unterkunft", "housing"]):
-                message_data["mentions_housing"] = True
-                results["statistics"]["housing_mentioned"] += 1
-            else:
-                message_data["mentions_housing"] = False
+                if len(history.messages) < 100 or history.messages[-1].date < SEARCH_START_DATE:
+                    break
                 
-            if any(word in text_lower for word in ["без немецкого", "без языка", "kein deutsch", "ohne sprache"]):
-                message_data["no_german_required"] = True
-                results["statistics"]["no_german_required"] += 1
-            else:
-                message_data["no_german_required"] = False
-            
-            # Berlin specific
-            if any(word in text_lower for word in ["берлин", "berlin", "штеглиц", "zehlendorf", "lichterfelde"]):
-                message_data["berlin_specific"] = True
-                results["statistics"]["berlin_specific"] += 1
-            else:
-                message_data["berlin_specific"] = False
-            
-            # Track by month
-            month_key = msg.date.strftime("%Y-%m")
-            results["statistics"]["by_month"][month_key] = results["statistics"]["by_month"].get(month_key, 0) + 1
-            
-            # Update query stats
-            for query in matched_queries:
-                results["statistics"]["by_query"][query] = results["statistics"]["by_query"].get(query, 0) + 1
+                offset_id = history.messages[-1].id
+                print(f"  [*] Analyzed {statistics['total_messages']} messages so far...")
             
-            results["messages"].append(message_data)
-        
-        results["statistics"]["total_messages"] = len(results["messages"])
-        
-        # Save results
-        report_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_dir = f"reports/{report_id}_niemci_extended_search_berlin_2025"
-        os.makedirs(output_dir, exist_ok=True)
-        os.makedirs(f"{output_dir}/raw_data", exist_ok=True)
-        
-        output_file = f"{output_dir}/niemci_extended_analysis_{report_id}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+            out.end()
+            out.write("statistics", statistics)
         
+        # Same bytes for the raw copy (hard link: no second write)
         raw_file = f"{output_dir}/raw_data/telegram_niemci_extended_{report_id}.json"
-        with open(raw_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        try:
+            os.link(output_file, raw_file)
+        except OSError:
+            shutil.copyfile(output_file, raw_file)
         
         print(f"\n{'='*60}")
         print(f"[+] Deep search complete!")
@@ -7,22 +7,28 @@ Compliance: OSINT SOP v2.3 / Persistence SOP v1.0
 """
 
 import asyncio
-import json
+import functools
 import os
 import hashlib
+import heapq
 import re
+import shutil
 from datetime import datetime, timezone
+from collections import Counter
 from telethon import TelegramClient
-from telethon.tl.functions.messages import SearchRequest
-from telethon.tl.types import InputMessagesFilterEmpty
 from dotenv import load_dotenv
 
+from _keywords import KeywordMatcher
+from _output import JsonStreamWriter
+from _telegram import gather_bounded, EntityCache
+
 # ─── Configuration ───
 load_dotenv()
 
 API_ID = os.getenv('TELEGRAM_API_ID')
 API_HASH = os.getenv('TELEGRAM_API_HASH')
 PHONE = os.getenv('TELEGRAM_PHONE')
+SESSION_NAME = 'osint_session'
 
 # Extended window: May 2025 – Feb 2026 (wider for phone number hits)
 SEARCH_START = datetime(2025, 5, 1, tzinfo=timezone.utc)
@@ -135,6 +141,15 @@ BERLIN_CONSTRUCTION_QUERIES = [
 
 ALL_QUERIES = PHONE_QUERIES + ENTITY_QUERIES + BERLIN_CONSTRUCTION_QUERIES
 
+# Queries are matched locally against each channel's history instead of one
+# SearchRequest per query per channel. A query matches when all of its words
+# (single letters dropped) occur in the message.
+QUERY_TERMS = [
+    (query, frozenset(word for word in query.lower().split() if len(word) > 1))
+    for query in ALL_QUERIES
+]
+QUERY_TERM_MATCHER = KeywordMatcher({word for _, words in QUERY_TERMS for word in words})
+
 # ─── Phone number patterns for detection in message text ───
 PHONE_PATTERNS = [
     r'\+44\s*7\d{3}\s*\d{3}\s*\d{3}',    # UK mobile
@@ -150,93 +165,143 @@ PHONE_PATTERNS = [
     r'7494\s*401\s*874',                    # Known JPG number
     r'1577\s*710\s*3445',                   # Known German number
 ]
+# All patterns as one alternation, scanned in a single pass per message
+PHONE_RE = re.compile("|".join(f"(?:{pattern})" for pattern in PHONE_PATTERNS))
+# Every byte except ASCII 0-9, for the digits-only view of a message
+NON_DIGIT_BYTES = bytes(b for b in range(256) if not 0x30 <= b <= 0x39)
+
+# ─── Relevance scoring ───
+# CRITICAL: Known phone numbers, matched against the message's digits (score +5 each)
+KNOWN_PHONES = [
+    "7881228865", "7777213139", "7387793670",
+    "7459878923", "7908973686", "7494401874",
+    "15777103445", "737884015", "88475588"
+]
+KNOWN_PHONE_POINTS = 5
+
+# Indicator tag -> (score per keyword, keywords)
+SCORE_KEYWORDS = {
+    # HIGH: Entity names
+    "ENTITY": (3, [
+        "jpg recruitment", "itaar", "pfalzburger",
+        "jkbeautyinstitut", "jk_beauty", "bagratuni",
+        "primaholding", "voxenergie", "sol-tech"
+    ]),
+    # MEDIUM: Person names
+    "PERSON": (2, [
+        "anastasia", "anatoliy", "elmira",
+        "vukusic", "marijana fenster", "mario kovac"
+    ]),
+    # MEDIUM: Location matches
+    "LOCATION": (2, [
+        "lichterfelde", "stromnetz", "steglitz",
+        "110kv", "kabelbrücke", "ostpreußendamm"
+    ]),
+    # LOW: Construction Berlin
+    "CONSTRUCTION": (1, [
+        "bauhelfer berlin", "электрик берлин", "монтажник берлин",
+        "строитель берлин", "кабельщик", "scaffolder berlin",
+        "strabag", "stratieka", "boran", "planmann"
+    ]),
+}
+
+# One scan of the lowercased text for every keyword, labelled (tag, keyword),
+# and one scan of its digits for the known phones
+SCORE_MATCHER = KeywordMatcher({
+    (tag, kw): [kw] for tag, (_, words) in SCORE_KEYWORDS.items() for kw in words
+})
+KNOWN_PHONE_MATCHER = KeywordMatcher(KNOWN_PHONES)
+
+# Fewest digits any PHONE_PATTERNS match can contain ("+46 7" plus one digit
+# and whitespace) and the shortest known phone; texts with fewer digits skip
+# the corresponding scan
+MIN_PHONE_DIGITS = 4
+MIN_KNOWN_PHONE_DIGITS = min(len(phone) for phone in KNOWN_PHONES)
+
+# Distinct message texts whose scores are kept; recruitment channels repost
+# the same ad verbatim across channels, so repeats skip the scan
+SCORE_CACHE_SIZE = 50_000
+
+# Indicator tag -> statistics counter of messages with at least one such hit
+HIT_STATS = {
+    "KNOWN_PHONE": "known_phone_hits",
+    "ENTITY": "entity_hits",
+    "PERSON": "person_hits",
+}
+
+
+def match_queries(text_lower: str) -> list:
+    """Return the ALL_QUERIES entries whose words all occur in text_lower, in query order."""
+    found = QUERY_TERM_MATCHER.matches(text_lower)
+    return [query for query, words in QUERY_TERMS if words <= found]
 
 
 def compute_doc_id(channel: str, message_id: int) -> str:
     return hashlib.sha256(f"{channel}:{message_id}".encode()).hexdigest()
 
 
+def digits_only(text: str) -> str:
+    """Return the ASCII digits of text, in order (bytes.translate: no regex, no per-char loop)."""
+    return text.encode("ascii", "ignore").translate(None, NON_DIGIT_BYTES).decode("ascii")
+
+
 def extract_phones(text: str) -> list:
-    """Extract all phone numbers from message text."""
-    phones = []
-    for pattern in PHONE_PATTERNS:
-        matches = re.findall(pattern, text)
-        phones.extend(matches)
-    return list(set(phones))
+    """Extract all phone numbers from message text, deduplicated in order of appearance."""
+    return list(dict.fromkeys(PHONE_RE.findall(text)))
 
 
-def score_message(text: str) -> dict:
-    """Score a message for investigation relevance."""
-    text_lower = text.lower() if text else ""
+@functools.lru_cache(maxsize=SCORE_CACHE_SIZE)
+def _score_text(text: str, text_lower: str) -> tuple:
+    """Return (score, indicators, phones) for text; cached because reposts repeat it verbatim."""
     score = 0
     indicators = []
 
-    # CRITICAL: Known phone numbers (score +5 each)
-    known_phones = [
-        "7881228865", "7777213139", "7387793670",
-        "7459878923", "7908973686", "7494401874",
-        "15777103445", "737884015", "88475588"
-    ]
-    text_digits = re.sub(r'\D', '', text)
-    for phone in known_phones:
-        if phone in text_digits:
-            score += 5
-            indicators.append(f"KNOWN_PHONE:{phone}")
-
-    # HIGH: Entity names (score +3 each)
-    high_entities = [
-        "jpg recruitment", "itaar", "pfalzburger",
-        "jkbeautyinstitut", "jk_beauty", "bagratuni",
-        "primaholding", "voxenergie", "sol-tech"
-    ]
-    for entity in high_entities:
-        if entity in text_lower:
-            score += 3
-            indicators.append(f"ENTITY:{entity}")
-
-    # MEDIUM: Person names (score +2)
-    person_names = [
-        "anastasia", "anatoliy", "elmira",
-        "vukusic", "marijana fenster", "mario kovac"
-    ]
-    for name in person_names:
-        if name in text_lower:
-            score += 2
-            indicators.append(f"PERSON:{name}")
-
-    # MEDIUM: Location matches (score +2)
-    locations = [
-        "lichterfelde", "stromnetz", "steglitz",
-        "110kv", "kabelbrücke", "ostpreußendamm"
-    ]
-    for loc in locations:
-        if loc in text_lower:
-            score += 2
-            indicators.append(f"LOCATION:{loc}")
-
-    # LOW: Construction Berlin (score +1)
-    construction = [
-        "bauhelfer berlin", "электрик берлин", "монтажник берлин",
-        "строитель берлин", "кабельщик", "scaffolder berlin",
-        "strabag", "stratieka", "boran", "planmann"
-    ]
-    for kw in construction:
-        if kw in text_lower:
-            score += 1
-            indicators.append(f"CONSTRUCTION:{kw}")
+    # Most ads carry too few digits to hold any phone number: skip the phone scans
+    text_digits = digits_only(text)
+    if len(text_digits) >= MIN_KNOWN_PHONE_DIGITS:
+        phones_seen = KNOWN_PHONE_MATCHER.matches(text_digits)
+        for phone in KNOWN_PHONES:
+            if phone in phones_seen:
+                score += KNOWN_PHONE_POINTS
+                indicators.append(f"KNOWN_PHONE:{phone}")
+
+    found = SCORE_MATCHER.matches(text_lower)
+    for tag, (points, words) in SCORE_KEYWORDS.items():
+        for kw in words:
+            if (tag, kw) in found:
+                score += points
+                indicators.append(f"{tag}:{kw}")
 
     # Extract phones found in text
-    phones_found = extract_phones(text)
+    phones_found = extract_phones(text) if len(text_digits) >= MIN_PHONE_DIGITS else ()
+
+    return min(score, 20), tuple(indicators), tuple(phones_found)
 
+
+def score_message(text: str, text_lower: str = None) -> dict:
+    """
+    Score a message for investigation relevance.
+
+    Args:
+        text_lower: text.lower(), if the caller already has it
+    """
+    if text_lower is None:
+        text_lower = text.lower() if text else ""
+    score, indicators, phones_found = _score_text(text, text_lower)
     return {
-        "relevance_score": min(score, 20),
-        "indicators": indicators,
-        "phones_extracted": phones_found,
+        "relevance_score": score,
+        "indicators": list(indicators),
+        "phones_extracted": list(phones_found),
     }
 
 
-async def search_channel_phones(client, channel_name: str, results: dict):
-    """Search a channel with all phone/entity queries."""
+async def search_channel_phones(client, entities, channel_name: str, results: dict):
+    """
+    Search a channel with all phone/entity queries.
+
+    Args:
+        entities: EntityCache used to resolve channel_name
+    """
     print(f"\n{'='*60}")
     print(f"[*] CHANNEL: {channel_name}")
     print(f"{'='*60}")
@@ -249,77 +314,64 @@ async def search_channel_phones(client, channel_name: str, results: dict):
     }
 
     try:
-        entity = await client.get_entity(channel_name)
+        entity = await entities.resolve(client, channel_name)
         channel_data["status"] = "accessible"
-        channel_data["channel_title"] = getattr(entity, 'title', channel_name)
-        channel_data["channel_id"] = entity.id
-        print(f"  [+] Connected: {channel_data['channel_title']} (ID: {entity.id})")
+        channel_data["channel_title"] = entities.title(channel_name, getattr(entity, 'title', channel_name))
+        # Full Channel entities carry .id; cached InputPeerChannel peers carry .channel_id
+        channel_data["channel_id"] = getattr(entity, 'id', None) or getattr(entity, 'channel_id', None)
+        print(f"  [+] Connected: {channel_data['channel_title']} (ID: {channel_data['channel_id']})")
     except Exception as e:
         channel_data["status"] = "inaccessible"
         print(f"  [-] FAILED: {e}")
         results["channels"][channel_name] = channel_data
         return
 
-    seen_ids = set()
+    # One pass over the search window; iter_messages pages through history
+    # newest-first in batches of 100 until we pass SEARCH_START
+    query_counts = Counter()
+    try:
+        async for msg in client.iter_messages(entity, offset_date=SEARCH_END):
+            if msg.date < SEARCH_START:
+                break
+            if not msg.message:
+                continue
+
+            # Lowercased once; query matching and scoring share it
+            text_lower = msg.message.lower()
+            matched_queries = match_queries(text_lower)
+            if not matched_queries:
+                continue
+            query = matched_queries[0]
+            query_counts[query] += 1
+
+            scoring = score_message(msg.message, text_lower)
+
+            message_data = {
+                "doc_id": compute_doc_id(channel_name, msg.id),
+                "message_id": msg.id,
+                "date": msg.date,
+                "text": msg.message,
+                "matched_query": query,
+                "views": getattr(msg, 'views', 0),
+                "forwards": getattr(msg, 'forwards', 0),
+                **scoring,
+            }
+            channel_data["messages"].append(message_data)
+
+            if scoring["relevance_score"] >= 3:
+                print(f"  🔴 HIGH RELEVANCE (score={scoring['relevance_score']}): "
+                      f"msg_id={msg.id}, date={msg.date.date()}")
+                print(f"     Indicators: {scoring['indicators']}")
+                if scoring['phones_extracted']:
+                    print(f"     📞 Phones: {scoring['phones_extracted']}")
+                print(f"     Text: {msg.message[:200]}...")
+
+    except Exception as e:
+        print(f"  [-] History scan error: {e}")
 
     for query in ALL_QUERIES:
-        try:
-            search_result = await client(SearchRequest(
-                peer=entity,
-                q=query,
-                filter=InputMessagesFilterEmpty(),
-                min_date=SEARCH_START,
-                max_date=SEARCH_END,
-                offset_id=0,
-                add_offset=0,
-                limit=100,
-                max_id=0,
-                min_id=0,
-                hash=0
-            ))
-
-            new_count = 0
-            for msg in search_result.messages:
-                if msg.id in seen_ids:
-                    continue
-                if not msg.message:
-                    continue
-
-                seen_ids.add(msg.id)
-                new_count += 1
-
-                scoring = score_message(msg.message)
-
-                message_data = {
-                    "doc_id": compute_doc_id(channel_name, msg.id),
-                    "message_id": msg.id,
-                    "date": msg.date.isoformat(),
-                    "text": msg.message,
-                    "matched_query": query,
-                    "views": getattr(msg, 'views', 0),
-                    "forwards": getattr(msg, 'forwards', 0),
-                    **scoring,
-                }
-                channel_data["messages"].append(message_data)
-
-                if scoring["relevance_score"] >= 3:
-                    print(f"  🔴 HIGH RELEVANCE (score={scoring['relevance_score']}): "
-                          f"msg_id={msg.id}, date={msg.date.date()}")
-                    print(f"     Indicators: {scoring['indicators']}")
-                    if scoring['phones_extracted']:
-                        print(f"     📞 Phones: {scoring['phones_extracted']}")
-                    print(f"     Text: {msg.message[:200]}...")
-
-            if new_count > 0:
-                print(f"  [+] Query '{query}': {new_count} new messages")
-
-            await asyncio.sleep(0.5)
-
-        except Exception as e:
-            if "FLOOD" in str(e).upper():
-                print(f"  [⚠] FLOOD WAIT — sleeping 30s")
-                await asyncio.sleep(30)
-            continue
+        if query_counts[query]:
+            print(f"  [+] Query '{query}': {query_counts[query]} new messages")
 
     channel_data["total_messages"] = len(channel_data["messages"])
     results["channels"][channel_name] = channel_data
@@ -338,7 +390,8 @@ async def main():
     print(f"    Berlin Construction: {len(BERLIN_CONSTRUCTION_QUERIES)}")
     print("=" * 70)
 
-    client = TelegramClient('osint_session', int(API_ID), API_HASH)
+    client = TelegramClient(SESSION_NAME, int(API_ID), API_HASH)
+    entities = EntityCache(SESSION_NAME)
     await client.start(phone=PHONE)
     print("[+] Telegram client authenticated\n")
 
@@ -355,28 +408,7 @@ async def main():
         "channels": {},
     }
 
-    for channel in TARGET_CHANNELS:
-        await search_channel_phones(client, channel, results)
-        await asyncio.sleep(1)
-
-    # ─── Aggregate ───
-    all_messages = []
-    for ch_data in results["channels"].values():
-        all_messages.extend(ch_data.get("messages", []))
-
-    # Sort by relevance score
-    all_messages.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
-
-    results["statistics"] = {
-        "total_messages": len(all_messages),
-        "high_relevance_count": sum(1 for m in all_messages if m.get("relevance_score", 0) >= 3),
-        "known_phone_hits": sum(1 for m in all_messages if any("KNOWN_PHONE" in i for i in m.get("indicators", []))),
-        "entity_hits": sum(1 for m in all_messages if any("ENTITY" in i for i in m.get("indicators", []))),
-        "person_hits": sum(1 for m in all_messages if any("PERSON" in i for i in m.get("indicators", []))),
-        "top_findings": all_messages[:20],
-    }
-
-    # ─── Save ───
+    # ─── Output Files ───
     output_dir = "reports/20260213_142123_berlin_grid_attack_eg_volt/osint_construction"
     raw_dir = "reports/20260213_142123_berlin_grid_attack_eg_volt/raw_data"
     os.makedirs(output_dir, exist_ok=True)
@@ -386,15 +418,71 @@ async def main():
     out_file = os.path.join(output_dir, f"12_telegram_phone_entity_search_{ts}.json")
     raw_file = os.path.join(raw_dir, f"telegram_phone_entity_search_{ts}.json")
 
-    for fp in [out_file, raw_file]:
-        with open(fp, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+    stats = {
+        "total_messages": 0,
+        "high_relevance_count": 0,
+        "known_phone_hits": 0,
+        "entity_hits": 0,
+        "person_hits": 0,
+    }
+    # Top-20 findings as a min-heap of (score, -channel index, -message index, message),
+    # so ties keep TARGET_CHANNELS and collection order like a stable sort would
+    top_findings = []
+
+    # Channels are searched concurrently (bounded) on the one client; each is
+    # written to disk as it finishes and its messages are dropped from memory
+    async def search_channel(channel):
+        await search_channel_phones(client, entities, channel, results)
+        ch_data = results["channels"][channel]
+        await out.put_async(channel, ch_data)
+
+        messages = ch_data.pop("messages")
+        channel_index = TARGET_CHANNELS.index(channel)
+        stats["total_messages"] += len(messages)
+        # One pass per message for every counter and the top-findings heap
+        for i, m in enumerate(messages):
+            score = m.get("relevance_score", 0)
+            if score >= 3:
+                stats["high_relevance_count"] += 1
+            tags = {indicator.split(":", 1)[0] for indicator in m.get("indicators", ())}
+            for tag, stat in HIT_STATS.items():
+                if tag in tags:
+                    stats[stat] += 1
+            entry = (score, -channel_index, -i, m)
+            if len(top_findings) < 20:
+                heapq.heappush(top_findings, entry)
+            else:
+                heapq.heappushpop(top_findings, entry)
+
+        await asyncio.sleep(1)
+
+    with JsonStreamWriter(out_file) as out:
+        for key in ("investigation", "collection_type", "search_timestamp", "search_period",
+                    "target_phones", "target_entities"):
+            out.write(key, results[key])
+        out.begin("channels", dict)
+        await gather_bounded(search_channel, TARGET_CHANNELS)
+        out.end()
+
+        # ─── Aggregate ───
+        # Sorted by relevance score
+        stats["top_findings"] = [m for *_, m in sorted(top_findings, key=lambda e: e[:3], reverse=True)]
+        results["statistics"] = stats
+        out.write("statistics", stats)
+
+    # Report channels in TARGET_CHANNELS order, not completion order
+    results["channels"] = {ch: results["channels"][ch] for ch in TARGET_CHANNELS}
+
+    # Same bytes for the raw copy (hard link: no second write)
+    try:
+        os.link(out_file, raw_file)
+    except OSError:
+        shutil.copyfile(out_file, raw_file)
 
     # ─── Summary ───
     print("\n" + "=" * 70)
     print("  COLLECTION SUMMARY")
     print("=" * 70)
-    stats = results["statistics"]
     print(f"  Total Messages:          {stats['total_messages']}")
     print(f"  High Relevance (≥3):     {stats['high_relevance_count']}")
     print(f"  Known Phone Hits:        {stats['known_phone_hits']}")
@@ -411,13 +499,14 @@ async def main():
     if stats["high_relevance_count"] > 0:
         print(f"\n  🔴 TOP FINDINGS:")
         for finding in stats["top_findings"][:10]:
-            print(f"    Score {finding['relevance_score']}: [{finding['date'][:10]}] "
+            print(f"    Score {finding['relevance_score']}: [{finding['date']:%Y-%m-%d}] "
                   f"{finding['indicators']}")
             print(f"      {finding['text'][:150]}...")
 
     print(f"\n  [+] Results: {out_file}")
     print(f"  [+] Raw data: {raw_file}")
 
+    entities.save()
     await client.disconnect()
     print("\n[+] Done.")
 
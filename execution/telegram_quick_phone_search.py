@@ -5,27 +5,42 @@ Target: +44 7881 228865 and +44 7777 213139
 """
 
 import asyncio
-import json
 import os
 import re
 from datetime import datetime, timezone
-from telethon import TelegramClient
-from telethon.tl.functions.messages import SearchRequest
-from telethon.tl.types import InputMessagesFilterEmpty
 from dotenv import load_dotenv
 
+from _output import JsonStreamWriter
+from _telegram import gather_bounded, telegram_client, EntityCache, run
+
 load_dotenv()
 
 API_ID = os.getenv('TELEGRAM_API_ID')
 API_HASH = os.getenv('TELEGRAM_API_HASH')
 PHONE = os.getenv('TELEGRAM_PHONE')
+SESSION_NAME = 'osint_session'
+
+SEARCH_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+SEARCH_END = datetime(2026, 2, 15, tzinfo=timezone.utc)
 
+# National numbers (+44). Telegram search matches words and word prefixes,
+# so each number is searched once per token form it can take: compact
+# national ("7881228865"), compact international ("+447881228865") and the
+# leading group of spaced forms ("+44 7881 228865"). Hits are confirmed
+# locally against the full number in any spacing
 TARGET_PHONES = [
-    "+44 7881 228865",
-    "+44 7777 213139",
     "7881228865",
     "7777213139",
 ]
+PHONE_LEADING_GROUP_DIGITS = 4
+TARGET_PHONE_QUERIES = {
+    phone: (phone, "44" + phone, phone[:PHONE_LEADING_GROUP_DIGITS])
+    for phone in TARGET_PHONES
+}
+TARGET_PHONE_RES = {
+    phone: re.compile(r"[\s\-]*".join(phone))
+    for phone in TARGET_PHONES
+}
 
 CHANNELS = [
     "@Niemci",
@@ -43,46 +58,40 @@ CHANNELS = [
     "@layboard",
 ]
 
-async def search_channel(client, channel_name, phone_numbers):
+async def search_channel(client, entities, channel_name, phone_numbers):
     results = []
     try:
-        entity = await client.get_entity(channel_name)
+        entity = await entities.resolve(client, channel_name)
         print(f"  [+] {channel_name}")
     except Exception as e:
         print(f"  [-] {channel_name}: {e}")
         return results
 
     for phone in phone_numbers:
-        try:
-            search_result = await client(SearchRequest(
-                peer=entity,
-                q=phone,
-                filter=InputMessagesFilterEmpty(),
-                min_date=datetime(2025, 1, 1, tzinfo=timezone.utc),
-                max_date=datetime(2026, 2, 15, tzinfo=timezone.utc),
-                offset_id=0,
-                add_offset=0,
-                limit=50,
-                max_id=0,
-                min_id=0,
-                hash=0
-            ))
-
-            for msg in search_result.messages:
-                if not msg.message:
-                    continue
-                results.append({
-                    "channel": channel_name,
-                    "phone_query": phone,
-                    "message_id": msg.id,
-                    "date": msg.date.isoformat(),
-                    "text": msg.message[:500],
-                })
-
-            await asyncio.sleep(0.3)
-        except Exception as e:
-            print(f"    [!] {phone}: {e}")
-            continue
+        phone_re = TARGET_PHONE_RES[phone]
+        seen_ids = set()  # a message can be returned by several token forms
+        for query in TARGET_PHONE_QUERIES[phone]:
+            try:
+                # Every match in the window, newest first (no 50-result cap)
+                async for msg in client.iter_messages(entity, search=query, offset_date=SEARCH_END):
+                    if msg.date < SEARCH_START:
+                        break
+                    # A token form alone can belong to another number; confirm the full one
+                    if msg.id in seen_ids or not msg.message or not phone_re.search(msg.message):
+                        continue
+                    seen_ids.add(msg.id)
+                    results.append({
+                        "channel": channel_name,
+                        "phone_query": phone,
+                        "message_id": msg.id,
+                        "date": msg.date,
+                        "text": msg.message[:500],
+                    })
+
+                await asyncio.sleep(0.3)
+            except Exception as e:
+                print(f"    [!] {query}: {e}")
+                continue
 
     return results
 
@@ -94,36 +103,46 @@ async def main():
     print(f"  Channels: {len(CHANNELS)}")
     print("=" * 60)
 
-    client = TelegramClient('osint_session', int(API_ID), API_HASH)
-    await client.start(phone=PHONE)
-    print("[+] Connected\n")
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs("reports/telegram_search", exist_ok=True)
+    out_file = f"reports/telegram_search/phone_search_{ts}.json"
+
+    total = 0
+    preview = []  # first 20 results written, for the console summary
 
-    all_results = []
-    for channel in CHANNELS:
-        results = await search_channel(client, channel, TARGET_PHONES)
-        all_results.extend(results)
-        print(f"    Found: {len(results)} messages")
+    entities = EntityCache(SESSION_NAME)
 
-    await client.disconnect()
+    async with telegram_client(SESSION_NAME, API_ID, API_HASH, PHONE) as client:
+        print("[+] Connected\n")
 
-    print(f"\n[=] Total: {len(all_results)} messages")
+        # Channels are searched concurrently (bounded) on the one client;
+        # each channel's results go to disk as soon as it finishes
+        async def run_channel(channel):
+            nonlocal total
+            results = await search_channel(client, entities, channel, TARGET_PHONES)
+            await out.extend_async(results)
+            total += len(results)
+            preview.extend(results[:20 - len(preview)])
+            print(f"    {channel} found: {len(results)} messages")
 
-    if all_results:
+        with JsonStreamWriter(out_file) as out:
+            out.write("phones", TARGET_PHONES)
+            out.begin("results")
+            await gather_bounded(run_channel, CHANNELS)
+            out.end()
+            out.write("timestamp", datetime.now().isoformat())
+
+    entities.save()
+
+    print(f"\n[=] Total: {total} messages")
+
+    if preview:
         print("\n[+] Results:")
-        for r in all_results[:20]:
-            print(f"  [{r['date'][:10]}] {r['channel']}: {r['text'][:100]}...")
+        for r in preview:
+            print(f"  [{r['date']:%Y-%m-%d}] {r['channel']}: {r['text'][:100]}...")
 
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    os.makedirs("reports/telegram_search", exist_ok=True)
-    out_file = f"reports/telegram_search/phone_search_{ts}.json"
-    with open(out_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            "phones": TARGET_PHONES,
-            "results": all_results,
-            "timestamp": datetime.now().isoformat(),
-        }, f, ensure_ascii=False, indent=2)
     print(f"\n[+] Saved: {out_file}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
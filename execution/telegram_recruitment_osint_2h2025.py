@@ -6,15 +6,15 @@ Focus: Ukrainian/Eastern European construction worker recruitment
 Period: July-December 2025
 """
 
-import asyncio
-import json
 import os
-from datetime import datetime, timedelta
-from telethon import TelegramClient
-from telethon.tl.functions.messages import SearchRequest
-from telethon.tl.types import InputMessagesFilterEmpty
+from collections import Counter
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
+from _keywords import KeywordMatcher
+from _output import JsonStreamWriter
+from _telegram import gather_bounded, EntityCache, telegram_client, run
+
 # Load environment variables
 load_dotenv()
 
@@ -22,10 +22,12 @@ load_dotenv()
 API_ID = os.getenv('TELEGRAM_API_ID')
 API_HASH = os.getenv('TELEGRAM_API_HASH')
 PHONE = os.getenv('TELEGRAM_PHONE')
+SESSION_NAME = 'telegram_recruitment_session'
 
 # Investigation parameters
-SEARCH_START_DATE = datetime(2025, 7, 1)  # July 1, 2025
-SEARCH_END_DATE = datetime(2025, 12, 31)  # December 31, 2025
+# (UTC-aware: Telethon message dates are aware, naive bounds cannot be compared)
+SEARCH_START_DATE = datetime(2025, 7, 1, tzinfo=timezone.utc)  # July 1, 2025
+SEARCH_END_DATE = datetime(2025, 12, 31, tzinfo=timezone.utc)  # December 31, 2025
 
 # Search queries (German and Russian)
 SEARCH_QUERIES = [
@@ -88,20 +90,40 @@ CHANNELS_TO_SEARCH = [
     "@staffingberlin",
 ]
 
-async def search_telegram_recruitment():
+# ─── Classification Keywords ───
+# Label order is priority: the first language / recruitment type with a hit wins
+LANGUAGE_KEYWORDS = {
+    "russian": ["работа", "вакансия", "требуется"],
+    "ukrainian": ["робота", "вакансія"],
+}
+RECRUITMENT_TYPE_KEYWORDS = {
+    "staffing_agency": ["zeitarbeit", "personalvermittlung", "staffing"],
+    "subcontractor": ["subunternehmer", "nachunternehmer", "подрядчик"],
+    "ukrainian_specific": ["ukrainer", "украинец", "українець"],
+}
+STROMNETZ_KEYWORDS = ["stromnetz", "электросеть"]
+
+# Every classification keyword in one matcher, labelled (category, value),
+# so each message is scanned once
+CLASSIFY_MATCHER = KeywordMatcher({
+    **{("language", lang): words for lang, words in LANGUAGE_KEYWORDS.items()},
+    **{("recruitment_type", rt): words for rt, words in RECRUITMENT_TYPE_KEYWORDS.items()},
+    ("mentions", "stromnetz"): STROMNETZ_KEYWORDS,
+})
+
+async def search_telegram_recruitment(client):
     """
     Search Telegram for construction job recruitment in 2H 2025.
+
+    Args:
+        client: Started TelegramClient (see _telegram.telegram_client)
     """
     print(f"[*] Starting Telegram OSINT: Construction Job Recruitment (2H 2025)")
     print(f"[*] Search period: {SEARCH_START_DATE.date()} to {SEARCH_END_DATE.date()}")
     print(f"[*] Queries: {len(SEARCH_QUERIES)}")
     print(f"[*] Channels: {len(CHANNELS_TO_SEARCH)}")
     
-    # Initialize Telegram client
-    client = TelegramClient('telegram_recruitment_session', API_ID, API_HASH)
-    
-    await client.start(phone=PHONE)
-    print("[+] Telegram client authenticated")
+    entities = EntityCache(SESSION_NAME)
     
     all_results = {
         "investigation": "Berlin Grid Attack (EG Volt)",
@@ -113,7 +135,6 @@ async def search_telegram_recruitment():
         "search_queries": SEARCH_QUERIES,
         "channels_searched": CHANNELS_TO_SEARCH,
         "timestamp": datetime.now().isoformat(),
-        "messages": [],
         "statistics": {
             "total_messages": 0,
             "by_channel": {},
@@ -128,86 +149,83 @@ async def search_telegram_recruitment():
         }
     }
     
-    # Search each channel
-    for channel_username in CHANNELS_TO_SEARCH:
+    # Hot-path counters, merged into all_results["statistics"] once at the end
+    by_language = Counter(all_results["statistics"]["by_language"])
+    recruitment_types = Counter(all_results["statistics"]["recruitment_types"])
+    by_query = Counter()
+    
+    # Search each channel (bounded concurrency on one client)
+    async def search_channel(channel_username):
         print(f"\n[*] Searching channel: {channel_username}")
         
         try:
             # Get channel entity
-            channel = await client.get_entity(channel_username)
+            channel = await entities.resolve(client, channel_username)
+
+            # One probe before the query loop: a channel whose newest post
+            # predates the window cannot match any query
+            latest = await client.get_messages(channel, limit=1)
+            if not latest or latest[0].date < SEARCH_START_DATE:
+                print(f"  [-] No posts since {SEARCH_START_DATE.date()}, skipping")
+                all_results["statistics"]["by_channel"][channel_username] = 0
+                return
+
             channel_messages = []
+            seen_ids = set()
             
             # Search each query in this channel
             for query in SEARCH_QUERIES:
                 print(f"  [*] Query: '{query}'")
                 
                 try:
-                    # Search messages
-                    result = await client(SearchRequest(
-                        peer=channel,
-                        q=query,
-                        filter=InputMessagesFilterEmpty(),
-                        min_date=SEARCH_START_DATE,
-                        max_date=SEARCH_END_DATE,
-                        offset_id=0,
-                        add_offset=0,
-                        limit=100,
-                        max_id=0,
-                        min_id=0,
-                        hash=0
-                    ))
-                    
-                    # Process results
-                    for message in result.messages:
-                        if message.date >= SEARCH_START_DATE and message.date <= SEARCH_END_DATE:
-                            message_data = {
-                                "channel": channel_username,
-                                "message_id": message.id,
-                                "date": message.date.isoformat(),
-                                "text": message.message,
-                                "query": query,
-                                "views": message.views if hasattr(message, 'views') else 0,
-                                "forwards": message.forwards if hasattr(message, 'forwards') else 0,
-                            }
-                            
-                            # Classify message
-                            text_lower = message.message.lower() if message.message else ""
-                            
-                            # Language detection
-                            if any(word in text_lower for word in ["работа", "вакансия", "требуется"]):
-                                message_data["language"] = "russian"
-                                all_results["statistics"]["by_language"]["russian"] += 1
-                            elif any(word in text_lower for word in ["робота", "вакансія"]):
-                                message_data["language"] = "ukrainian"
-                                all_results["statistics"]["by_language"]["ukrainian"] += 1
-                            else:
-                                message_data["language"] = "german"
-                                all_results["statistics"]["by_language"]["german"] += 1
-                            
-                            # Recruitment type classification
-                            if any(word in text_lower for word in ["zeitarbeit", "personalvermittlung", "staffing"]):
-                                message_data["recruitment_type"] = "staffing_agency"
-                                all_results["statistics"]["recruitment_types"]["staffing_agency"] += 1
-                            elif any(word in text_lower for word in ["subunternehmer", "nachunternehmer", "подрядчик"]):
-                                message_data["recruitment_type"] = "subcontractor"
-                                all_results["statistics"]["recruitment_types"]["subcontractor"] += 1
-                            elif any(word in text_lower for word in ["ukrainer", "украинец", "українець"]):
-                                message_data["recruitment_type"] = "ukrainian_specific"
-                                all_results["statistics"]["recruitment_types"]["ukrainian_specific"] += 1
-                            else:
-                                message_data["recruitment_type"] = "direct_hiring"
-                                all_results["statistics"]["recruitment_types"]["direct_hiring"] += 1
-                            
-                            # Stromnetz Berlin specific
-                            if "stromnetz" in text_lower or "электросеть" in text_lower:
-                                message_data["stromnetz_related"] = True
-                            
-                            channel_messages.append(message_data)
-                            all_results["messages"].append(message_data)
+                    # Page through this query's matches newest-first from the end of
+                    # the window; iter_messages fetches more only while we keep going
+                    query_count = 0
+                    async for message in client.iter_messages(channel, search=query, offset_date=SEARCH_END_DATE):
+                        if message.date < SEARCH_START_DATE:
+                            break
+                        query_count += 1
+                        # Overlapping queries return the same posts: record each
+                        # message once, under the first query that found it
+                        if message.id in seen_ids:
+                            continue
+                        seen_ids.add(message.id)
+                        
+                        message_data = {
+                            "channel": channel_username,
+                            "message_id": message.id,
+                            "date": message.date,
+                            "text": message.message,
+                            "query": query,
+                            "views": getattr(message, 'views', 0) or 0,
+                            "forwards": getattr(message, 'forwards', 0) or 0,
+                        }
+                        
+                        # Classify message
+                        text_lower = message.message.lower() if message.message else ""
+                        found = CLASSIFY_MATCHER.matches(text_lower)
+                        
+                        # Language detection
+                        language = next((l for l in LANGUAGE_KEYWORDS if ("language", l) in found), "german")
+                        message_data["language"] = language
+                        by_language[language] += 1
+                        
+                        # Recruitment type classification
+                        recruitment_type = next(
+                            (rt for rt in RECRUITMENT_TYPE_KEYWORDS if ("recruitment_type", rt) in found),
+                            "direct_hiring"
+                        )
+                        message_data["recruitment_type"] = recruitment_type
+                        recruitment_types[recruitment_type] += 1
+                        
+                        # Stromnetz Berlin specific
+                        if ("mentions", "stromnetz") in found:
+                            message_data["stromnetz_related"] = True
+                        
+                        channel_messages.append(message_data)
                     
                     # Update statistics
-                    query_count = len([m for m in result.messages if m.date >= SEARCH_START_DATE and m.date <= SEARCH_END_DATE])
-                    all_results["statistics"]["by_query"][query] = all_results["statistics"]["by_query"].get(query, 0) + query_count
+                    by_query[query] += query_count
                     
                     print(f"    [+] Found {query_count} messages")
                     
@@ -215,6 +233,9 @@ async def search_telegram_recruitment():
                     print(f"    [-] Error searching query '{query}': {e}")
                     continue
             
+            # One write per channel rather than one per message
+            await out.extend_async(channel_messages)
+            
             # Update channel statistics
             all_results["statistics"]["by_channel"][channel_username] = len(channel_messages)
             print(f"  [+] Total messages from {channel_username}: {len(channel_messages)}")
@@ -222,27 +243,43 @@ async def search_telegram_recruitment():
         except Exception as e:
             print(f"  [-] Error accessing channel {channel_username}: {e}")
             all_results["statistics"]["by_channel"][channel_username] = 0
-            continue
-    
-    # Update total count
-    all_results["statistics"]["total_messages"] = len(all_results["messages"])
-    
-    # Save results
+            return
+
     output_dir = "reports/20260213_142123_berlin_grid_attack_eg_volt/osint_construction"
     os.makedirs(output_dir, exist_ok=True)
-    
     output_file = os.path.join(output_dir, "10_telegram_recruitment_2h2025.json")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_results, f, ensure_ascii=False, indent=2)
+
+    # Messages are streamed to disk as they are found; statistics follow them
+    with JsonStreamWriter(output_file) as out:
+        for key in ("investigation", "search_focus", "search_period", "search_queries",
+                    "channels_searched", "timestamp"):
+            out.write(key, all_results[key])
+        out.begin("messages")
+        await gather_bounded(search_channel, CHANNELS_TO_SEARCH)
+        out.end()
+
+        # Update total count
+        all_results["statistics"]["total_messages"] = sum(all_results["statistics"]["by_channel"].values())
+        all_results["statistics"].update(
+            by_query=dict(by_query),
+            by_language=dict(by_language),
+            recruitment_types=dict(recruitment_types),
+        )
+        out.write("statistics", all_results["statistics"])
     
     print(f"\n[+] Results saved to: {output_file}")
     print(f"[+] Total messages found: {all_results['statistics']['total_messages']}")
     print(f"[+] By language: German={all_results['statistics']['by_language']['german']}, Russian={all_results['statistics']['by_language']['russian']}, Ukrainian={all_results['statistics']['by_language']['ukrainian']}")
     print(f"[+] Recruitment types: Direct={all_results['statistics']['recruitment_types']['direct_hiring']}, Staffing={all_results['statistics']['recruitment_types']['staffing_agency']}, Subcontractor={all_results['statistics']['recruitment_types']['subcontractor']}, Ukrainian-specific={all_results['statistics']['recruitment_types']['ukrainian_specific']}")
     
-    await client.disconnect()
+    entities.save()
     
     return all_results
 
+async def main():
+    async with telegram_client(SESSION_NAME, API_ID, API_HASH, PHONE) as client:
+        print("[+] Telegram client authenticated")
+        return await search_telegram_recruitment(client)
+
 if __name__ == "__main__":
-    asyncio.run(search_telegram_recruitment())
+    run(main())